@@ -0,0 +1,48 @@
+"""add balance history created at
+
+Revision ID: 3e8b5d1f6c27
+Revises: 9c4e1d7b2a38
+Create Date: 2026-10-19 10:42:17.204915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8b5d1f6c27'
+down_revision = '9c4e1d7b2a38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('balance_history', sa.Column('created_at', sa.DateTime(), nullable=True))
+    # A row keeps the state before its change, the change itself is dated
+    # by the next row of the balance or by the balance for the last one
+    op.execute(
+        """
+        UPDATE balance_history h
+        SET created_at = coalesce(changes.changed_at, now()::timestamp)
+        FROM (
+            SELECT balance_history.id,
+                   coalesce(
+                       lead(balance_history.date) OVER (
+                           PARTITION BY balance_history.balance_id
+                           ORDER BY balance_history.id
+                       ),
+                       balance.date
+                   ) AS changed_at
+            FROM balance_history
+            LEFT JOIN balance ON balance.id = balance_history.balance_id
+        ) AS changes
+        WHERE changes.id = h.id
+        """
+    )
+    op.alter_column('balance_history', 'created_at', nullable=False)
+    op.create_index('ix_balance_history_balance_id_created_at', 'balance_history', ['balance_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_balance_history_balance_id_created_at', table_name='balance_history')
+    op.drop_column('balance_history', 'created_at')
@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 
+from app.idempotency import IdempotencyMiddleware
 from app.metadata import api_description, api_version, api_title, api_contacts, tags_metadata
 from . import routers
 
@@ -11,4 +12,5 @@ app = FastAPI(
     openapi_tags=tags_metadata
 )
 
+app.add_middleware(IdempotencyMiddleware)
 app.include_router(routers.router)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, Response, status
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 
 
-from app.auth.serializer import UpdateUser, Token, User, CreateUser
+from app.auth.serializer import UpdateUser, Token, User, CreateUser, Principal, RefreshToken, UserSession
 from app.auth.service import AuthService, get_current_user
 
 router = APIRouter(
@@ -14,41 +16,82 @@ router = APIRouter(
 @router.post("/sign-up", response_model=Token)
 async def sign_up(
         user: CreateUser,
+        user_agent: Optional[str] = Header(None),
         service: AuthService = Depends()
 ):
-    return service.sign_up(user)
+    return await service.sign_up(user, user_agent)
 
 
 @router.post("/sign-in", response_model=Token)
 async def sign_in(
+        request: Request,
         form_data: OAuth2PasswordRequestForm = Depends(),
+        user_agent: Optional[str] = Header(None),
+        service: AuthService = Depends()
+):
+    return await service.sign_in(
+        form_data.username, form_data.password, user_agent,
+        request.client.host if request.client else None
+    )
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+        data: RefreshToken,
         service: AuthService = Depends()
 ):
-    return service.sign_in(form_data.username, form_data.password)
+    return await service.refresh(data.refresh_token)
+
+
+@router.post("/sign-out", status_code=status.HTTP_204_NO_CONTENT)
+async def sign_out(
+        data: RefreshToken,
+        service: AuthService = Depends()
+):
+    await service.sign_out(data.refresh_token)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get("/sessions", response_model=List[UserSession])
+async def get_sessions(
+        principal: Principal = Depends(get_current_user),
+        service: AuthService = Depends()
+):
+    return await service.get_sessions(principal.id)
+
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_session(
+        session_id: int,
+        principal: Principal = Depends(get_current_user),
+        service: AuthService = Depends()
+):
+    await service.revoke_session(principal.id, session_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 # It's not correct work need fix
 @router.get("/get_user", response_model=User)
 async def get_user(
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: AuthService = Depends()
 ):
-    return service.get_user(user_id)
+    return await service.get_user(principal.id)
 
 
 @router.put("/update_user", response_model=Token)
 async def update_user(
         user_data: UpdateUser,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: AuthService = Depends()
 ):
-    return service.update_user(user_id, user_data)
+    return await service.update_user(principal.id, user_data, principal.session_id)
 
 
 @router.delete("/delete_user", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: AuthService = Depends()
 ):
-    service.delete_user(user_id)
+    await service.delete_user(principal.id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,59 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from fastapi import HTTPException, status
+from passlib.hash import bcrypt
+
+from app.settings import settings
+
+T = TypeVar('T')
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a bounded thread pool so a password check doesn't
+    block the event loop. bcrypt releases the GIL, so threads hash in
+    parallel. Calls over queue_size are rejected instead of piling up.
+    """
+
+    def __init__(self, rounds: int, workers: int, queue_size: int):
+        self.context = bcrypt.using(rounds=rounds)
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='bcrypt'
+        )
+        self.queue_size = queue_size
+        self.pending = 0
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        if self.pending >= self.queue_size:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Too many password checks in progress, try again later',
+                headers={'Retry-After': '1'},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, password, hashed_password)
+
+    def needs_update(self, hashed_password: str) -> bool:
+        # True when the hash was made with other rounds than configured
+        return self.context.needs_update(hashed_password)
+
+
+hasher = PasswordHasher(
+    rounds=settings.password_bcrypt_rounds,
+    workers=settings.password_hash_workers,
+    queue_size=settings.password_hash_queue_size
+)
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel
@@ -32,6 +33,35 @@ class UpdateUser(BaseUser):
     password: str
 
 
+class Principal(BaseModel):
+    # Authenticated user of the current request
+    id: int
+    role: Optional[UserRole] = None
+    company_id: Optional[int] = None
+    worker_id: Optional[int] = None
+    # Signed in session of the access token
+    session_id: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+
+class RefreshToken(BaseModel):
+    refresh_token: str
+
+
+class UserSession(BaseModel):
+    id: int
+    device: Optional[str] = None
+    created_at: datetime
+    last_used_at: datetime
+    expires_at: datetime
+
+    class Config:
+        orm_mode = True
@@ -1,13 +1,20 @@
+import hashlib
+import secrets
+import time
 from datetime import datetime, timedelta
+from typing import List, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from passlib.hash import bcrypt
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import utils
-from app.auth.serializer import UpdateUser, CreateUser, Token, User
+from app.auth.hashing import hasher
+from app.auth.serializer import UpdateUser, CreateUser, Token, User, Principal
+from app.auth.throttling import login_throttle
+from app.auth.token_cache import token_cache, denylist
 from app.balance.service import BalanceService
 from app.database import models
 from app.database.database import get_session
@@ -17,56 +24,202 @@ from app.settings import settings
 auth = OAuth2PasswordBearer(tokenUrl="/auth/sign-in")
 
 
-def get_current_user(token: str = Depends(auth)):
-    return AuthService.verify_token(token)
+async def get_current_user(
+        token: str = Depends(auth),
+        session: AsyncSession = Depends(get_session)
+) -> Principal:
+    payload = await AuthService.verify_token(token)
+    if 'role' in payload:
+        return Principal(
+            id=payload['sub'],
+            role=payload['role'],
+            company_id=payload['company_id'],
+            worker_id=payload['worker_id'],
+            session_id=payload.get('sid')
+        )
+
+    # Services share the session, so they get this user from identity map
+    user = await utils.get_user(session, int(payload['sub']))
+    # Close the read transaction, services start their own ones
+    await session.commit()
+    return Principal.from_orm(user).copy(update={'session_id': payload.get('sid')})
 
 
 class AuthService:
 
-    def __init__(self, session: Session = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
         self.session = session
 
-    def sign_up(self, user_data: CreateUser) -> Token:
-        password_hash = self.hash_password(user_data.password)
+    async def sign_up(
+            self,
+            user_data: CreateUser,
+            device: Optional[str] = None
+    ) -> Token:
+        password_hash = await self.hash_password(user_data.password)
         user = models.User(
             username=user_data.username,
             email=user_data.email,
             role=user_data.role.value,
             password=password_hash
         )
-        utils.save_in_db(self.session, user)
+        await utils.save_in_db(self.session, user)
 
-        BalanceService.create_balance(
+        await BalanceService.create_balance(
             session=self.session,
             ident=user.id,
             balance_type=BalanceType.USER
         )
 
-        return self.create_token(user)
+        return await self.start_session(user, device)
+
+    async def sign_in(
+            self,
+            username: str,
+            password: str,
+            device: Optional[str] = None,
+            client_ip: Optional[str] = None
+    ) -> Token:
+        await login_throttle.check(username, client_ip)
 
-    def sign_in(self, username: str, password: str) -> Token:
         exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Incorrect username or password',
             headers={'WWW-Authenticate': 'Bearer'},
         )
 
-        user = (
-            self.session
-            .query(models.User)
+        user = await self.session.scalar(
+            select(models.User)
             .filter_by(username=username)
-            .first()
         )
 
         if not user:
             raise exception
-        if not self.verify_password(password, user.password):
+        if not await self.verify_password(password, user.password):
             raise exception
 
-        return self.create_token(user)
+        if hasher.needs_update(user.password):
+            # Saved by the commit of the new session
+            user.password = await self.hash_password(password)
+
+        return await self.start_session(user, device)
+
+    async def start_session(
+            self,
+            user: models.User,
+            device: Optional[str] = None
+    ) -> Token:
+        refresh_token = secrets.token_urlsafe(32)
+        now = datetime.now()
+        user_session = models.UserSession(
+            user_id=user.id,
+            token_hash=self.hash_token(refresh_token),
+            device=device,
+            created_at=now,
+            last_used_at=now,
+            expires_at=now + timedelta(days=settings.jwt_refresh_expire_days)
+        )
+        self.session.add(user_session)
+        await self.session.flush()
+        token = self.create_token(user, user_session.id)
+        await self.session.commit()
+
+        token.refresh_token = refresh_token
+        return token
+
+    async def refresh(self, refresh_token: str) -> Token:
+        """
+        Rotates the refresh token: the presented one stops working and a
+        new pair is issued. The session is found by the unique index on
+        the token hash, so no password check is needed.
+        """
+        new_refresh_token = secrets.token_urlsafe(32)
+        now = datetime.now()
+        async with self.session.begin():
+            user_session = await self.session.scalar(
+                update(models.UserSession)
+                .where(
+                    models.UserSession.token_hash == self.hash_token(refresh_token),
+                    models.UserSession.revoked_at.is_(None),
+                    models.UserSession.expires_at > now
+                )
+                .values(
+                    token_hash=self.hash_token(new_refresh_token),
+                    last_used_at=now,
+                    expires_at=now + timedelta(days=settings.jwt_refresh_expire_days)
+                )
+                .returning(models.UserSession)
+                .execution_options(synchronize_session=False)
+            )
+            if not user_session:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail='Invalid refresh token',
+                    headers={'WWW-Authenticate': 'Bearer'},
+                )
+
+            user = await self.session.get(models.User, user_session.user_id)
+
+        token = self.create_token(user, user_session.id)
+        token.refresh_token = new_refresh_token
+        return token
+
+    async def sign_out(self, refresh_token: str) -> None:
+        revoked = await self.session.scalar(
+            update(models.UserSession)
+            .where(
+                models.UserSession.token_hash == self.hash_token(refresh_token),
+                models.UserSession.revoked_at.is_(None)
+            )
+            .values(revoked_at=datetime.now())
+            .returning(models.UserSession.id)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
+        if revoked:
+            await self.revoke_access_tokens(revoked)
+
+    async def get_sessions(self, user_id: int) -> List[models.UserSession]:
+        result = await self.session.scalars(
+            select(models.UserSession)
+            .filter(
+                models.UserSession.user_id == user_id,
+                models.UserSession.revoked_at.is_(None),
+                models.UserSession.expires_at > datetime.now()
+            )
+            .order_by(models.UserSession.last_used_at.desc())
+        )
+        return result.all()
+
+    async def revoke_session(self, user_id: int, session_id: int) -> None:
+        revoked = await self.session.scalar(
+            update(models.UserSession)
+            .where(
+                models.UserSession.id == session_id,
+                models.UserSession.user_id == user_id,
+                models.UserSession.revoked_at.is_(None)
+            )
+            .values(revoked_at=datetime.now())
+            .returning(models.UserSession.id)
+            .execution_options(synchronize_session=False)
+        )
+        if not revoked:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Сессии с идентификатором {session_id} нет в базе!"
+            )
+        await self.session.commit()
+        await self.revoke_access_tokens(session_id)
+
+    @classmethod
+    async def revoke_access_tokens(cls, session_id: int) -> None:
+        # Access tokens of the session are rejected until the last one expires
+        await denylist.add(
+            f'session:{session_id}',
+            time.time() + settings.jwt_expire_minutes * 60
+        )
 
-    def get_user(self, user_id: int) -> models.User:
-        user = self.session.query(models.User).get(user_id)
+    async def get_user(self, user_id: int) -> models.User:
+        user = await self.session.get(models.User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -74,60 +227,81 @@ class AuthService:
             )
         return user
 
-    def update_user(
+    async def update_user(
             self,
             user_id: int,
-            user_data: UpdateUser
+            user_data: UpdateUser,
+            session_id: Optional[int] = None
     ) -> Token:
-        user = self.get_user(user_id)
+        user = await self.get_user(user_id)
         for field, value in user_data:
             setattr(user, field, value)
 
-        user.password = self.hash_password(user_data.password)
-        utils.check_unique(self.session)
-        self.session.refresh(user)
-        return self.create_token(user)
+        user.password = await self.hash_password(user_data.password)
+        await utils.check_unique(self.session)
+        await self.session.refresh(user)
+        # The new token stays in the session, so signing out revokes it
+        return self.create_token(user, session_id)
 
-    def delete_user(self, user_id: int) -> None:
-        user = self.get_user(user_id)
+    async def delete_user(self, user_id: int) -> None:
+        user = await self.get_user(user_id)
         if user.role == UserRole.ADMIN:
-            company = self.session.query(models.Company).get(user.company_id)
-            self.session.delete(company)
-            self.session.commit()
-        self.session.delete(user)
-        self.session.commit()
+            company = await self.session.get(models.Company, user.company_id)
+            await self.session.delete(company)
+            await self.session.commit()
+        await self.session.delete(user)
+        await self.session.commit()
 
     @classmethod
-    def verify_password(cls, plain_password: str, hashed_password) -> bool:
-        return bcrypt.verify(plain_password, hashed_password)
+    async def verify_password(cls, plain_password: str, hashed_password) -> bool:
+        return await hasher.verify(plain_password, hashed_password)
 
     @classmethod
-    def hash_password(cls, password: str) -> str:
-        return bcrypt.hash(password)
+    async def hash_password(cls, password: str) -> str:
+        return await hasher.hash(password)
 
     @classmethod
-    def verify_token(cls, token: str) -> int:
+    def hash_token(cls, refresh_token: str) -> str:
+        # Refresh tokens are stored only as hashes, a leaked table can't be
+        # used to sign in. Verified access tokens are cached by it too.
+        return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+    @classmethod
+    async def verify_token(cls, token: str) -> dict:
         exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Could not validate credentials',
             headers={'WWW-Authenticate': 'Bearer'},
         )
 
-        try:
-            payload = jwt.decode(
-                token=token,
-                key=settings.jwt_secret,
-                algorithms=settings.jwt_algorithm
-            )
-        except JWTError:
-            raise exception
+        key = cls.hash_token(token)
+        payload = token_cache.get(key)
+        if payload is None:
+            try:
+                payload = jwt.decode(
+                    token=token,
+                    key=settings.jwt_secret,
+                    algorithms=settings.jwt_algorithm
+                )
+            except JWTError:
+                raise exception
+
+            if payload.get("sub", None) is None:
+                raise exception
 
-        user_id = payload.get("sub", None)
+            token_cache.set(key, payload)
 
-        return int(user_id)
+        if 'sid' in payload and await denylist.contains(f"session:{payload['sid']}"):
+            raise exception
+
+        return payload
 
     @classmethod
-    def create_token(cls, user: models.User) -> Token:
+    def create_token(
+            cls,
+            user: models.User,
+            session_id: Optional[int] = None
+    ) -> Token:
         user_data = User.from_orm(user)
 
         date = datetime.utcnow()
@@ -137,6 +311,14 @@ class AuthService:
             "exp": date + timedelta(minutes=settings.jwt_expire_minutes),
             "sub": str(user_data.id)
         }
+        if session_id:
+            payload["sid"] = session_id
+        if settings.jwt_user_claims:
+            payload.update({
+                "role": user_data.role.value if user_data.role else None,
+                "company_id": user_data.company_id,
+                "worker_id": user_data.worker_id
+            })
 
         token = jwt.encode(
             payload,
@@ -0,0 +1,116 @@
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.redis import get_redis
+from app.settings import settings
+
+
+class AttemptStorage(ABC):
+    # Sliding window log of attempts per key
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: int) -> float:
+        """
+        Records an attempt if fewer than limit were made during the last
+        window seconds. Returns 0 then, otherwise the seconds until the
+        oldest attempt leaves the window. Rejected attempts aren't kept.
+        """
+
+
+class MemoryAttemptStorage(AttemptStorage):
+    # Seen only by the current process
+
+    max_keys = 10000
+
+    def __init__(self):
+        self.attempts = {}
+
+    async def hit(self, key: str, limit: int, window: int) -> float:
+        now = time.monotonic()
+        if len(self.attempts) > self.max_keys:
+            self.attempts = {
+                k: v for k, v in self.attempts.items() if v[-1] > now - window
+            }
+
+        attempts = self.attempts.setdefault(key, deque())
+        while attempts and attempts[0] <= now - window:
+            attempts.popleft()
+        if len(attempts) >= limit:
+            return attempts[0] + window - now
+
+        attempts.append(now)
+        return 0
+
+
+class RedisAttemptStorage(AttemptStorage):
+    # Shared by all processes, a sorted set of attempt times per key
+
+    @property
+    def client(self):
+        return get_redis()
+
+    async def hit(self, key: str, limit: int, window: int) -> float:
+        key = f'attempts:{key}'
+        now = time.time()
+        member = uuid.uuid4().hex
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(key, 0, now - window)
+            pipe.zadd(key, {member: now})
+            pipe.zcard(key)
+            pipe.expire(key, window)
+            _, _, count, _ = await pipe.execute()
+
+        if count <= limit:
+            return 0
+
+        await self.client.zrem(key, member)
+        oldest = await self.client.zrange(key, 0, 0, withscores=True)
+        return max(oldest[0][1] + window - now, 0) if oldest else 0
+
+
+class LoginThrottle:
+    """
+    Limits sign in attempts per username and per client address,
+    so a brute force burst is rejected before any bcrypt work.
+    """
+
+    def __init__(
+            self,
+            storage: AttemptStorage,
+            window: int,
+            username_limit: int,
+            ip_limit: int
+    ):
+        self.storage = storage
+        self.window = window
+        self.username_limit = username_limit
+        self.ip_limit = ip_limit
+
+    async def check(self, username: str, client_ip: Optional[str]) -> None:
+        retry_after = await self.storage.hit(
+            f'username:{username.lower()}', self.username_limit, self.window
+        )
+        if not retry_after and client_ip:
+            retry_after = await self.storage.hit(
+                f'ip:{client_ip}', self.ip_limit, self.window
+            )
+
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail='Too many sign in attempts, try again later',
+                headers={'Retry-After': str(int(retry_after) + 1)},
+            )
+
+
+login_throttle = LoginThrottle(
+    storage=RedisAttemptStorage() if settings.redis_url else MemoryAttemptStorage(),
+    window=settings.login_attempts_window,
+    username_limit=settings.login_attempts_per_username,
+    ip_limit=settings.login_attempts_per_ip
+)
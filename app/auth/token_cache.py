@@ -0,0 +1,84 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from app.redis import get_redis
+from app.settings import settings
+
+
+class TokenCache:
+    """
+    LRU of already verified token payloads keyed by the token hash.
+    An entry lives until the token's exp, so a cached token is never
+    accepted longer than jwt.decode would accept it.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict]:
+        payload = self.entries.get(key)
+        if payload is None:
+            return None
+        if payload['exp'] <= time.time():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return payload
+
+    def set(self, key: str, payload: dict) -> None:
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = payload
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+class Denylist(ABC):
+    # Revoked keys, each is kept until the given unix time
+
+    @abstractmethod
+    async def add(self, key: str, expires_at: float) -> None:
+        ...
+
+    @abstractmethod
+    async def contains(self, key: str) -> bool:
+        ...
+
+
+class MemoryDenylist(Denylist):
+    # Seen only by the current process
+
+    def __init__(self):
+        self.entries = {}
+
+    async def add(self, key: str, expires_at: float) -> None:
+        now = time.time()
+        self.entries = {k: v for k, v in self.entries.items() if v > now}
+        self.entries[key] = expires_at
+
+    async def contains(self, key: str) -> bool:
+        expires_at = self.entries.get(key)
+        return expires_at is not None and expires_at > time.time()
+
+
+class RedisDenylist(Denylist):
+    # Shared by all processes, keys expire in redis itself
+
+    @property
+    def client(self):
+        return get_redis()
+
+    async def add(self, key: str, expires_at: float) -> None:
+        await self.client.set(f'denylist:{key}', 1, exat=int(expires_at) + 1)
+
+    async def contains(self, key: str) -> bool:
+        return bool(await self.client.exists(f'denylist:{key}'))
+
+
+token_cache = TokenCache(maxsize=settings.jwt_cache_size)
+denylist = RedisDenylist() if settings.redis_url else MemoryDenylist()
@@ -1,12 +1,16 @@
-from typing import List
-
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
 
+from app.auth.serializer import Principal
 from app.auth.service import get_current_user
-from app.balance.serializer import Balance, BalanceHistory
+from app.balance.serializer import Balance, BalanceHistory, BalanceAt
 from app.balance.service import BalanceService
 from app.database.enums import BalanceType
+from app.dates import NaiveDatetime
+from app.etag import conditional_response, make_etag
+from app.export import ExportFormat, export_response
 from app.finances.serializer import Period
+from app.pagination import Pagination, Page
+from app.serialization import Fields, fieldset, rows_page_response
 
 router = APIRouter(
     prefix='/balance',
@@ -17,17 +21,57 @@ router = APIRouter(
 @router.get('/{balance_type}', response_model=Balance)
 async def get_balance(
         balance_type: BalanceType,
-        user_id: int = Depends(get_current_user),
+        request: Request,
+        response: Response,
+        principal: Principal = Depends(get_current_user),
+        service: BalanceService = Depends()
+):
+    balance = await service.get_balance(principal, balance_type)
+    return conditional_response(
+        request=request,
+        response=response,
+        etag=make_etag(balance.id, balance.date, balance.balance),
+        content=balance
+    )
+
+
+@router.get('/{balance_type}/at', response_model=BalanceAt)
+async def get_balance_at(
+        balance_type: BalanceType,
+        date: NaiveDatetime,
+        principal: Principal = Depends(get_current_user),
         service: BalanceService = Depends()
 ):
-    return service.get_balance(user_id, balance_type)
+    return await service.get_balance_at(principal, balance_type, date)
 
 
-@router.get('/{balance_type}/history/', response_model=List[BalanceHistory])
+@router.get('/{balance_type}/history/', response_model=Page[BalanceHistory])
 async def get_balance_history(
         balance_type: BalanceType,
         period: Period = Depends(),
-        user_id: int = Depends(get_current_user),
+        pagination: Pagination = Depends(),
+        fields: Fields = Depends(fieldset(BalanceHistory)),
+        principal: Principal = Depends(get_current_user),
+        service: BalanceService = Depends()
+):
+    page = await service.get_balance_history(
+        principal, balance_type, period, pagination, fields
+    )
+    return rows_page_response(page, BalanceHistory, fields)
+
+
+@router.get('/{balance_type}/history/export')
+async def export_balance_history(
+        balance_type: BalanceType,
+        export_format: ExportFormat = Query(ExportFormat.NDJSON, alias='format'),
+        period: Period = Depends(),
+        principal: Principal = Depends(get_current_user),
         service: BalanceService = Depends()
 ):
-    return service.get_balance_history(user_id, balance_type, period)
+    rows = await service.stream_balance_history(principal, balance_type, period)
+    return export_response(
+        rows=rows,
+        serializer=BalanceHistory,
+        export_format=export_format,
+        filename=f'{balance_type.value}_balance_history'
+    )
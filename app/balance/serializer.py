@@ -21,6 +21,11 @@ class Balance(BaseBalance):
         orm_mode = True
 
 
+class BalanceAt(BaseBalance):
+    id: int
+    date: datetime
+
+
 class CreateBalance(BaseBalance):
     pass
 
@@ -3,24 +3,30 @@ from decimal import Decimal
 from typing import List, Union
 
 from fastapi import Depends, HTTPException, status
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app import utils
+from app.auth.serializer import Principal
+from app.balance.serializer import BalanceHistory
 from app.database import models
 from app.database.database import get_session
 from app.database.enums import BalanceType, UserRole, TransactionType
+from app.export import YIELD_PER
 from app.finances.serializer import Period
+from app.pagination import Pagination, paginate
+from app.serialization import Fields, serializer_columns
 
 
 class BalanceService:
 
-    def __init__(self, session: Session = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
         self.session = session
 
-    def get_balance(
+    async def get_balance(
             self,
-            user_id: int,
+            principal: Principal,
             balance_type: BalanceType
     ) -> models.Balance:
         exception = HTTPException(
@@ -28,8 +34,8 @@ class BalanceService:
             detail=f"У этого аккаунта пока нет баланса"
                    f"но вы можете его создать!"
         )
-        owner = self._get_balance_owner(
-            user_id=user_id,
+        owner = await self._get_balance_owner(
+            principal=principal,
             balance_type=balance_type
         )
 
@@ -38,65 +44,125 @@ class BalanceService:
 
         return owner.balance
 
-    def get_balance_history(
+    async def get_balance_at(
             self,
-            user_id: int,
+            principal: Principal,
             balance_type: BalanceType,
-            period: Period
+            date: datetime
+    ) -> dict:
+        """
+        History rows keep the balance before each change. So the balance
+        at any moment is prev_balance of the first change recorded after
+        it, found with one seek of the (balance_id, created_at) index,
+        or the current balance when there is no such change. Dates of
+        the changes are given by clients and can't order them.
+        """
+        balance = await self.get_balance(principal, balance_type)
+
+        amount = await self.session.scalar(
+            select(models.BalanceHistory.prev_balance)
+            .filter(
+                models.BalanceHistory.balance_id == balance.id,
+                models.BalanceHistory.created_at > date
+            )
+            .order_by(
+                models.BalanceHistory.created_at,
+                models.BalanceHistory.id
+            )
+            .limit(1)
+        )
+        if amount is None:
+            amount = balance.balance
+
+        return {'id': balance.id, 'balance': amount, 'date': date}
+
+    async def get_balance_history(
+            self,
+            principal: Principal,
+            balance_type: BalanceType,
+            period: Period,
+            pagination: Pagination,
+            fields: Fields = None
     ):
-        owner = self._get_balance_owner(
-            user_id=user_id,
+        owner = await self._get_balance_owner(
+            principal=principal,
             balance_type=balance_type
         )
 
+        return await paginate(
+            session=self.session,
+            query=self._history_query(owner.balance, period, fields),
+            model=models.BalanceHistory,
+            pagination=pagination,
+            rows=True
+        )
+
+    async def stream_balance_history(
+            self,
+            principal: Principal,
+            balance_type: BalanceType,
+            period: Period
+    ) -> AsyncResult:
+        owner = await self._get_balance_owner(
+            principal=principal,
+            balance_type=balance_type
+        )
+
+        return await self.session.stream(
+            self._history_query(owner.balance, period)
+            .order_by(models.BalanceHistory.date, models.BalanceHistory.id),
+            execution_options={'yield_per': YIELD_PER}
+        )
+
+    @classmethod
+    def _history_query(
+            cls,
+            balance: models.Balance,
+            period: Period,
+            fields: Fields = None
+    ):
         return (
-            self.session
-            .query(models.BalanceHistory)
+            select(*serializer_columns(models.BalanceHistory, BalanceHistory, fields))
             .filter(
                 and_(
-                    models.BalanceHistory.balance_id == owner.balance.id,
+                    models.BalanceHistory.balance_id == balance.id,
                     models.BalanceHistory.date >= period.from_date,
                     models.BalanceHistory.date < period.to_date
                 )
             )
-            .all()
         )
 
-    def _get_company(
+    async def _get_company(
             self,
-            user_id: int,
+            principal: Principal,
             permissions: List[UserRole]
     ) -> models.Company:
-        user = utils.check_user_permission(
+        user = await utils.check_user_permission(
             session=self.session,
-            user_id=user_id,
+            principal=principal,
             permissions=permissions
         )
         return user.company
 
-    def _get_balance_owner(
+    async def _get_balance_owner(
             self,
-            user_id: int,
+            principal: Principal,
             balance_type: BalanceType
     ) -> Union[models.User, models.Company]:
         if balance_type == BalanceType.USER:
-            user: models.User = utils.get_in_db(
-                session=self.session,
-                model=models.User,
-                ident=user_id
-            )
+            user = await utils.get_user(self.session, principal.id)
             return user
         else:
-            company = self._get_company(
-                user_id=user_id,
+            company = await self._get_company(
+                principal=principal,
                 permissions=[UserRole.ADMIN, UserRole.DIRECTOR]
             )
             return company
 
     @classmethod
-    def create_balance(
+    async def create_balance(
             cls,
-            session: Session,
+            session: AsyncSession,
             ident: int,
             balance_type: BalanceType
     ):
@@ -108,11 +174,12 @@ class BalanceService:
         else:
             balance.company_id = ident
 
-        utils.save_in_db(session, balance)
+        await utils.save_in_db(session, balance)
 
     @classmethod
-    def change_balance(
+    async def change_balance(
             cls,
+            session: AsyncSession,
             amount: Decimal,
             transaction_type: TransactionType,
             date: datetime,
@@ -120,25 +187,66 @@ class BalanceService:
             invoice: models.Invoice = None,
             finance: models.Finance = None
     ) -> tuple[models.Balance, models.BalanceHistory]:
+        """
+        Changes the balance in one UPDATE, so concurrent changes can't
+        lose each other. The history row gets the state before the change
+        which is returned from the locked row the UPDATE is joined with.
+        """
+        # New invoice or finance gets its id
+        await session.flush()
+
+        table = models.Balance.__table__
+        previous = (
+            select(
+                table.c.id,
+                table.c.balance,
+                table.c.date,
+                table.c.invoice_id,
+                table.c.finance_id
+            )
+            .filter(table.c.id == balance.id)
+            .with_for_update()
+            .subquery()
+        )
+        if transaction_type == TransactionType.INCOME:
+            new_balance = table.c.balance + amount
+        else:
+            new_balance = table.c.balance - amount
+
+        # Core statement, ORM update can't return columns of the subquery
+        result = await session.execute(
+            update(table)
+            .where(table.c.id == previous.c.id)
+            .values(
+                balance=new_balance,
+                date=date,
+                invoice_id=invoice.id if invoice else table.c.invoice_id,
+                finance_id=finance.id if finance else table.c.finance_id
+            )
+            .returning(
+                previous.c.balance.label('prev_balance'),
+                previous.c.date.label('prev_date'),
+                previous.c.invoice_id.label('prev_invoice_id'),
+                previous.c.finance_id.label('prev_finance_id'),
+                table.c.balance,
+                table.c.invoice_id,
+                table.c.finance_id
+            )
+        )
+        row = result.one()
+
+        for field in ('balance', 'invoice_id', 'finance_id'):
+            set_committed_value(balance, field, getattr(row, field))
+        set_committed_value(balance, 'date', date)
+
         balance_history = models.BalanceHistory(
-            prev_balance=balance.balance,
-            date=balance.date,
+            prev_balance=row.prev_balance,
+            date=row.prev_date,
             amount=amount,
             transaction_type=transaction_type,
-            invoice_id=balance.invoice_id,
-            finance_id=balance.finance_id,
+            invoice_id=row.prev_invoice_id,
+            finance_id=row.prev_finance_id,
             balance_id=balance.id
         )
 
-        if transaction_type == TransactionType.INCOME:
-            balance.balance += amount
-        else:
-            balance.balance -= amount
-
-        balance.date = date
-        if invoice:
-            balance.invoice_id = invoice.id
-        if finance:
-            balance.finance_id = finance.id
-
         return balance, balance_history
@@ -1,11 +1,16 @@
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
 
+from app.auth.serializer import Principal
 from app.auth.service import get_current_user
-from app.budget.serializer import Budget, BudgetHistory
+from app.budget.serializer import Budget, BudgetHistory, BudgetAnalytics, AnalyticsInterval
 from app.budget.service import BudgetService
+from app.etag import conditional_response, make_etag
+from app.export import ExportFormat, export_response
 from app.finances.serializer import Period
+from app.pagination import Pagination, Page
+from app.serialization import Fields, fieldset, rows_page_response
 
 router = APIRouter(
     prefix='/budget',
@@ -14,20 +19,66 @@ router = APIRouter(
 
 
 @router.get('/', response_model=Budget)
-def get_budget(
-        user_id: int = Depends(get_current_user),
+async def get_budget(
+        request: Request,
+        response: Response,
+        principal: Principal = Depends(get_current_user),
         service: BudgetService = Depends()
 ):
-    return service.get_budget(user_id=user_id)
+    budget = await service.get_budget(principal=principal)
+    return conditional_response(
+        request=request,
+        response=response,
+        etag=make_etag(budget.id, budget.date, budget.income, budget.expense, budget.profit),
+        content=budget
+    )
+
+
+@router.get('/history', response_model=Page[BudgetHistory])
+async def get_budget_history(
+        period: Period = Depends(),
+        pagination: Pagination = Depends(),
+        fields: Fields = Depends(fieldset(BudgetHistory)),
+        principal: Principal = Depends(get_current_user),
+        service: BudgetService = Depends()
+):
+    page = await service.get_budget_history(
+        principal=principal,
+        period=period,
+        pagination=pagination,
+        fields=fields
+    )
+    return rows_page_response(page, BudgetHistory, fields)
+
+
+@router.get('/history/export')
+async def export_budget_history(
+        export_format: ExportFormat = Query(ExportFormat.NDJSON, alias='format'),
+        period: Period = Depends(),
+        principal: Principal = Depends(get_current_user),
+        service: BudgetService = Depends()
+):
+    rows = await service.stream_budget_history(
+        principal=principal,
+        period=period
+    )
+    return export_response(
+        rows=rows,
+        serializer=BudgetHistory,
+        export_format=export_format,
+        filename='budget_history'
+    )
 
 
-@router.get('/history', response_model=List[BudgetHistory])
-def get_budget_history(
+@router.get('/analytics', response_model=List[BudgetAnalytics])
+async def get_budget_analytics(
+        interval: AnalyticsInterval = AnalyticsInterval.DAY,
         period: Period = Depends(),
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: BudgetService = Depends()
 ):
-    return service.get_budget_history(
-        user_id=user_id,
+    return await service.get_budget_analytics(
+        principal=principal,
+        interval=interval,
         period=period
     )
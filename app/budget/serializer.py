@@ -1,3 +1,4 @@
+import enum
 from datetime import datetime
 from decimal import Decimal
 
@@ -47,3 +48,14 @@ class BudgetHistory(BaseBudget, BaseBudgetHistory):
 
 class CreateBudgetHistory(BaseBudgetHistory):
     pass
+
+
+class AnalyticsInterval(str, enum.Enum):
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+
+
+class BudgetAnalytics(BaseBudget):
+    period: datetime
+    count: int
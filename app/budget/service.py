@@ -1,38 +1,117 @@
 from datetime import datetime
 from decimal import Decimal
+from typing import List
 
 from fastapi import Depends
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app import utils
+from app.auth.serializer import Principal
+from app.budget.serializer import AnalyticsInterval, BudgetHistory
 from app.database import models
 from app.database.database import get_session
 from app.database.enums import UserRole, TransactionType
+from app.export import YIELD_PER
 from app.finances.serializer import Period
+from app.pagination import Pagination, paginate
+from app.serialization import Fields, serializer_columns
 
 
 class BudgetService:
 
-    def __init__(self, session: Session = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
         self.session = session
 
-    def get_budget(
+    async def get_budget(
             self,
-            user_id: int,
+            principal: Principal,
     ) -> models.Budget:
-        return self._get_budget(user_id)
+        return await self._get_budget(principal)
 
-    def get_budget_history(
+    async def get_budget_history(
             self,
-            user_id: int,
-            period: Period
+            principal: Principal,
+            period: Period,
+            pagination: Pagination,
+            fields: Fields = None
     ):
-        budget = self._get_budget(user_id)
+        budget = await self._get_budget(principal)
+
+        return await paginate(
+            session=self.session,
+            query=self._history_query(budget, period, fields),
+            model=models.BudgetHistory,
+            pagination=pagination,
+            rows=True
+        )
+
+    async def stream_budget_history(
+            self,
+            principal: Principal,
+            period: Period
+    ) -> AsyncResult:
+        budget = await self._get_budget(principal)
+
+        return await self.session.stream(
+            self._history_query(budget, period)
+            .order_by(models.BudgetHistory.date, models.BudgetHistory.id),
+            execution_options={'yield_per': YIELD_PER}
+        )
 
+    async def get_budget_analytics(
+            self,
+            principal: Principal,
+            interval: AnalyticsInterval,
+            period: Period
+    ) -> List[dict]:
+        """
+        Sums finances of the company per day, week or month in the
+        database, so only one row per bucket is sent back.
+        """
+        budget = await self._get_budget(principal)
+
+        bucket = func.date_trunc(interval.value, models.Finance.date)
+        income = func.coalesce(
+            func.sum(models.Finance.amount)
+            .filter(models.Finance.transaction_type == TransactionType.INCOME),
+            0
+        )
+        expense = func.coalesce(
+            func.sum(models.Finance.amount)
+            .filter(models.Finance.transaction_type == TransactionType.EXPENSE),
+            0
+        )
+        result = await self.session.execute(
+            select(
+                bucket.label('period'),
+                income.label('income'),
+                expense.label('expense'),
+                (income - expense).label('profit'),
+                func.count().label('count')
+            )
+            .filter(
+                and_(
+                    models.Finance.company_id == budget.company_id,
+                    models.Finance.date >= period.from_date,
+                    models.Finance.date < period.to_date
+                )
+            )
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        return result.mappings().all()
+
+    @classmethod
+    def _history_query(
+            cls,
+            budget: models.Budget,
+            period: Period,
+            fields: Fields = None
+    ):
         return (
-            self.session
-            .query(models.BudgetHistory)
+            select(*serializer_columns(models.BudgetHistory, BudgetHistory, fields))
             .filter(
                 and_(
                     models.BudgetHistory.budget_id == budget.id,
@@ -40,24 +119,23 @@ class BudgetService:
                     models.BudgetHistory.date < period.to_date
                 )
             )
-            .all()
         )
 
-    def _get_budget(
+    async def _get_budget(
             self,
-            user_id: int,
+            principal: Principal,
     ) -> models.Budget:
-        user = utils.check_user_permission(
+        user = await utils.check_user_permission(
             session=self.session,
-            user_id=user_id,
+            principal=principal,
             permissions=[UserRole.DIRECTOR, UserRole.ADMIN]
         )
         return user.company.budget
 
     @classmethod
-    def create_budget(
+    async def create_budget(
             cls,
-            session: Session,
+            session: AsyncSession,
             company_id: int
     ):
         budget = models.Budget(
@@ -67,32 +145,100 @@ class BudgetService:
             date=datetime.now(),
             company_id=company_id
         )
-        utils.save_in_db(session, budget)
+        await utils.save_in_db(session, budget)
 
     @classmethod
-    def change_budget(
+    async def change_budget(
             cls,
+            session: AsyncSession,
             budget: models.Budget,
-            finance: models.Finance
-    ) -> tuple[models.Budget, models.BudgetHistory]:
-        budget_history = models.BudgetHistory(
-            income=budget.income,
-            expense=budget.expense,
-            profit=budget.profit,
-            date=budget.date,
-            amount=finance.amount,
-            transaction_type=finance.transaction_type,
-            finance_id=budget.finance_id,
-            budget_id=budget.id
+            finances: List[models.Finance]
+    ) -> List[models.BudgetHistory]:
+        """
+        Adds the finances to the budget in one UPDATE by their sums,
+        so concurrent writers can't overwrite each other's totals.
+        History rows are built from the state before the change which
+        is returned from the locked row, one per finance in their order.
+        """
+        if not finances:
+            return []
+        # New finances get their ids
+        await session.flush()
+
+        income = sum(
+            (finance.amount for finance in finances
+             if finance.transaction_type == TransactionType.INCOME),
+            Decimal(0)
+        )
+        expense = sum(
+            (finance.amount for finance in finances
+             if finance.transaction_type == TransactionType.EXPENSE),
+            Decimal(0)
+        )
+        last = finances[-1]
+
+        table = models.Budget.__table__
+        previous = (
+            select(
+                table.c.id,
+                table.c.income,
+                table.c.expense,
+                table.c.profit,
+                table.c.date,
+                table.c.finance_id
+            )
+            .filter(table.c.id == budget.id)
+            .with_for_update()
+            .subquery()
         )
-        if finance.transaction_type == TransactionType.INCOME:
-            budget.income += finance.amount
-            budget.profit += finance.amount
-        if finance.transaction_type == TransactionType.EXPENSE:
-            budget.expense += finance.amount
-            budget.profit -= finance.amount
+        # Core statement, ORM update can't return columns of the subquery
+        row = (await session.execute(
+            update(table)
+            .where(table.c.id == previous.c.id)
+            .values(
+                income=table.c.income + income,
+                expense=table.c.expense + expense,
+                profit=table.c.profit + income - expense,
+                date=last.date,
+                finance_id=last.id
+            )
+            .returning(
+                previous.c.income.label('prev_income'),
+                previous.c.expense.label('prev_expense'),
+                previous.c.profit.label('prev_profit'),
+                previous.c.date.label('prev_date'),
+                previous.c.finance_id.label('prev_finance_id'),
+                table.c.income,
+                table.c.expense,
+                table.c.profit
+            )
+        )).one()
+
+        for field in ('income', 'expense', 'profit'):
+            set_committed_value(budget, field, getattr(row, field))
+        set_committed_value(budget, 'date', last.date)
+        set_committed_value(budget, 'finance_id', last.id)
 
-        budget.date = finance.date
-        budget.finance_id = finance.id
+        income, expense, profit = row.prev_income, row.prev_expense, row.prev_profit
+        date, finance_id = row.prev_date, row.prev_finance_id
+        history = []
+        for finance in finances:
+            history.append(models.BudgetHistory(
+                income=income,
+                expense=expense,
+                profit=profit,
+                date=date,
+                amount=finance.amount,
+                transaction_type=finance.transaction_type,
+                finance_id=finance_id,
+                budget_id=budget.id
+            ))
+            if finance.transaction_type == TransactionType.INCOME:
+                income += finance.amount
+                profit += finance.amount
+            if finance.transaction_type == TransactionType.EXPENSE:
+                expense += finance.amount
+                profit -= finance.amount
+            date, finance_id = finance.date, finance.id
 
-        return budget, budget_history
+        return history
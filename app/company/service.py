@@ -1,9 +1,12 @@
 from typing import List
 
 from fastapi import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app import utils
+from app.auth.serializer import Principal
 from app.balance.service import BalanceService
 from app.budget.service import BudgetService
 from app.company.serializer import CreateCompany, UpdateCompany
@@ -13,121 +16,135 @@ from app.database.enums import UserRole, BalanceType
 
 
 class CompanyService:
-    def __init__(self, session: Session = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
         self.session = session
 
-    def _get_company(
+    async def _get_company(
             self,
-            user_id: int,
+            principal: Principal,
             permissions: List[UserRole]
     ) -> models.User:
-        user = utils.check_user_permission(
+        user = await utils.check_user_permission(
             session=self.session,
-            user_id=user_id,
+            principal=principal,
             permissions=permissions
         )
         return user
 
-    def get_company(self, user_id: int) -> models.Company:
-        user = self._get_company(
-            user_id=user_id,
+    async def _load_company(self, company_id: int) -> models.Company:
+        # Company is serialized with workers and users,
+        # load them eagerly because async session can't do it lazily.
+        return await self.session.scalar(
+            select(models.Company)
+            .filter_by(id=company_id)
+            .options(
+                selectinload(models.Company.workers)
+                .selectinload(models.Worker.users),
+                selectinload(models.Company.users)
+            )
+        )
+
+    async def get_company(self, principal: Principal) -> models.Company:
+        user = await self._get_company(
+            principal=principal,
             permissions=[UserRole.ADMIN, UserRole.DIRECTOR]
         )
-        return user.company
+        return await self._load_company(user.company_id)
 
-    def create_company(
+    async def create_company(
             self,
-            user_id: int,
+            principal: Principal,
             data: CreateCompany
     ) -> models.Company:
-        user = utils.check_user_company(self.session, user_id)
+        user = await utils.check_user_company(self.session, principal.id)
 
         company = models.Company(
             **data.dict()
         )
-        utils.save_in_db(self.session, company)
+        await utils.save_in_db(self.session, company)
 
         user.company_id = company.id
         user.role = UserRole.DIRECTOR
-        utils.update_in_db(self.session, user)
+        await utils.update_in_db(self.session, user)
 
-        BalanceService.create_balance(
+        await BalanceService.create_balance(
             session=self.session,
             ident=company.id,
             balance_type=BalanceType.COMPANY
         )
 
-        BudgetService.create_budget(
+        await BudgetService.create_budget(
             session=self.session,
             company_id=company.id
         )
 
-        return company
+        return await self._load_company(company.id)
 
-    def update_company(
+    async def update_company(
             self,
-            user_id: int,
+            principal: Principal,
             data: UpdateCompany
     ) -> models.Company:
-        user = self._get_company(user_id, [UserRole.DIRECTOR])
+        user = await self._get_company(principal, [UserRole.DIRECTOR])
 
         for field, value in data:
             setattr(user.company, field, value)
 
-        utils.update_in_db(self.session, user.company)
+        await utils.update_in_db(self.session, user.company)
 
-        return user.company
+        return await self._load_company(user.company_id)
 
-    def delete_company(
+    async def delete_company(
             self,
-            user_id: int
+            principal: Principal
     ):
-        director = self._get_company(user_id, [UserRole.DIRECTOR])
+        director = await self._get_company(principal, [UserRole.DIRECTOR])
+        company = await self._load_company(director.company_id)
 
-        for user in director.company.users:
+        for user in company.users:
             user.role = UserRole.CUSTOMER
             user.company_id = None
 
-        utils.delete_in_db(self.session, director.company)
+        await utils.delete_in_db(self.session, company)
 
-    def add_user(
+    async def add_user(
             self,
             new_user_id: int,
-            user_id: int
+            principal: Principal
     ):
-        user = self._get_company(
-            user_id=user_id,
+        user = await self._get_company(
+            principal=principal,
             permissions=[UserRole.DIRECTOR, UserRole.ADMIN]
         )
 
-        new_user = utils.check_user_company(
+        new_user = await utils.check_user_company(
             session=self.session,
             user_id=new_user_id
         )
         new_user.company_id = user.company_id
         new_user.role = UserRole.ADMIN
-        utils.update_in_db(self.session, new_user)
+        await utils.update_in_db(self.session, new_user)
 
-    def delete_user(
+    async def delete_user(
             self,
             deleted_user_id: int,
-            user_id: int
+            principal: Principal
     ):
-        user = self._get_company(
-            user_id=user_id,
+        user = await self._get_company(
+            principal=principal,
             permissions=[UserRole.DIRECTOR, UserRole.ADMIN]
         )
 
-        old_user: models.User = utils.get_in_db(
+        old_user: models.User = await utils.get_in_db(
             session=self.session,
             model=models.User,
             ident=deleted_user_id
         )
         utils.check_delete_status(
-            admin_user_id=user_id,
-            company=user.company,
+            admin_user_id=principal.id,
+            company=await self._load_company(user.company_id),
             old_user=old_user
         )
         old_user.company_id = None
         old_user.role = UserRole.CUSTOMER
-        utils.update_in_db(self.session, old_user)
+        await utils.update_in_db(self.session, old_user)
@@ -1,28 +1,39 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+
+from app.database.pool import MonitoredPool
 from app.settings import settings
 
+# Sync URL is kept for alembic migrations, the application itself
+# works through the asyncpg driver.
 DATABASE_URL = f'postgresql://' \
                f'{settings.postgres_user}:{settings.postgres_password}@' \
                f'{settings.postgres_host}/{settings.postgres_db}'
 
-engine = create_engine(
-    DATABASE_URL
+ASYNC_DATABASE_URL = f'postgresql+asyncpg://' \
+                     f'{settings.postgres_user}:{settings.postgres_password}@' \
+                     f'{settings.postgres_host}/{settings.postgres_db}'
+
+engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=MonitoredPool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_pool_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    pool_use_lifo=settings.db_pool_use_lifo
 )
 
-Session = sessionmaker(
+Session = async_sessionmaker(
     bind=engine,
-    autocommit=False,
-    autoflush=False
+    autoflush=False,
+    expire_on_commit=False
 )
 
 Base = declarative_base()
 
 
-def get_session():
-    session = Session()
-    try:
+async def get_session():
+    async with Session() as session:
         yield session
-    finally:
-        session.close()
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Integer, Column, String, Numeric, ForeignKey, DateTime, Float, Enum, Boolean
+from sqlalchemy import Integer, Column, String, Numeric, ForeignKey, DateTime, Float, Enum, Boolean, Index, Text, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 
 from app.database.database import Base
@@ -29,6 +29,42 @@ class User(Base):
                            uselist=False, cascade="all, delete")
 
 
+class UserSession(Base):
+    # Signed in device, holds the hash of its refresh token
+    __tablename__ = 'user_sessions'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    device = Column(String)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    last_used_at = Column(DateTime, nullable=False, default=datetime.now)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime)
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'),
+                     nullable=False, index=True)
+    user = relationship('User')
+
+
+class IdempotencyKey(Base):
+    # Response of a POST sent with the Idempotency-Key header, for retries
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'key'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    response = Column(Text)
+    media_type = Column(String)
+    created_at = Column(DateTime, nullable=False, default=datetime.now, index=True)
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'),
+                     nullable=False)
+
+
 class Company(Base):
     __tablename__ = 'company'
 
@@ -68,6 +104,9 @@ class Worker(Base):
 class Finance(Base):
     # Expense and Income table
     __tablename__ = 'finances'
+    __table_args__ = (
+        Index('ix_finances_company_id_date', 'company_id', 'date'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     amount = Column(Numeric(20, 3))
@@ -107,6 +146,9 @@ class Budget(Base):
 
 class BudgetHistory(Base):
     __tablename__ = 'budget_history'
+    __table_args__ = (
+        Index('ix_budget_history_budget_id_date', 'budget_id', 'date'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     income = Column(Numeric(20, 3))
@@ -147,10 +189,16 @@ class Balance(Base):
 
 class BalanceHistory(Base):
     __tablename__ = 'balance_history'
+    __table_args__ = (
+        Index('ix_balance_history_balance_id_date', 'balance_id', 'date'),
+        Index('ix_balance_history_balance_id_created_at', 'balance_id', 'created_at'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     prev_balance = Column(Numeric(20, 3))
     date = Column(DateTime, default=datetime.now)
+    # When the change was recorded, dates of the requests may be in any order
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
     transaction_type = Column(Enum(TransactionType))
     amount = Column(Numeric(20, 3))
 
@@ -166,6 +214,10 @@ class BalanceHistory(Base):
 
 class Invoice(Base):
     __tablename__ = 'invoices'
+    __table_args__ = (
+        Index('ix_invoices_company_id_date', 'company_id', 'date'),
+        Index('ix_invoices_user_id_date', 'user_id', 'date'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     to_pay = Column(Numeric(20, 3))
@@ -190,6 +242,13 @@ class Invoice(Base):
 
 class Product(Base):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Catalogue of a company shows only products in stock
+        Index(
+            'ix_products_company_id_in_stock', 'company_id',
+            postgresql_where=text('quantity > 0')
+        ),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, unique=True, nullable=False)
@@ -211,6 +270,6 @@ class InvoiceProduct(Base):
     __tablename__ = 'invoices_products'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    invoice_id = Column(Integer, ForeignKey('invoices.id'), nullable=False)
-    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    invoice_id = Column(Integer, ForeignKey('invoices.id'), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False, index=True)
     # quantity = Column(Float, nullable=False)
@@ -0,0 +1,44 @@
+import time
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStatistics:
+    """Counters of connection checkouts and time spent waiting for them."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_last = 0.0
+
+    def add_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_last = seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    @property
+    def wait_avg(self) -> float:
+        if not self.checkouts:
+            return 0.0
+        return self.wait_total / self.checkouts
+
+
+statistics = PoolStatistics()
+
+
+class MonitoredPool(AsyncAdaptedQueuePool):
+    """Queue pool which measures how long every checkout waits."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            statistics.timeouts += 1
+            raise
+        statistics.add_wait(time.perf_counter() - start)
+        return connection
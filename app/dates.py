@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from pydantic.datetime_parse import parse_datetime
+
+
+def to_naive(value: datetime) -> datetime:
+    # Columns are naive local time, as datetime.now() gives
+    if value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+class NaiveDatetime(datetime):
+    """
+    Datetime of requests, an offset such as Z or +03:00 is converted
+    to the local time. asyncpg refuses to compare aware values with
+    the naive columns.
+    """
+
+    @classmethod
+    def __get_validators__(cls):
+        yield parse_datetime
+        yield to_naive
+
+    @classmethod
+    def __modify_schema__(cls, field_schema: dict) -> None:
+        field_schema.update(type='string', format='date-time')
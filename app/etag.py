@@ -0,0 +1,49 @@
+import hashlib
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*version) -> str:
+    # Weak, the same version may be sent in other encodings
+    digest = hashlib.sha1('|'.join(str(part) for part in version).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+
+    # Weak comparison, ignores the W/ prefix of both tags
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for tag in header.split(','):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith('W/') else tag) == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={'ETag': etag}
+    )
+
+
+def conditional_response(
+        request: Request,
+        response: Response,
+        etag: str,
+        content
+):
+    """
+    Answers 304 without a body when the client has this version already,
+    otherwise returns the content with its ETag for the next poll.
+    """
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers['ETag'] = etag
+    return content
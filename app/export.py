@@ -0,0 +1,87 @@
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncResult
+
+from app.serialization import serialize_rows
+
+# Rows fetched from the server side cursor at once
+# and sent to the client as one chunk.
+YIELD_PER = 1000
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: 'application/x-ndjson',
+    ExportFormat.CSV: 'text/csv',
+}
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def _ndjson_chunks(
+        rows: AsyncResult,
+        serializer: Type[BaseModel]
+):
+    async for partition in rows.partitions():
+        yield ''.join(
+            json.dumps(item) + '\n'
+            for item in serialize_rows(partition, serializer)
+        )
+
+
+async def _csv_chunks(
+        rows: AsyncResult,
+        serializer: Type[BaseModel]
+):
+    fields = list(serializer.__fields__)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+
+    async for partition in rows.partitions():
+        for row in partition:
+            writer.writerow([_csv_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Header of an empty export
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(
+        rows: AsyncResult,
+        serializer: Type[BaseModel],
+        export_format: ExportFormat,
+        filename: str
+) -> StreamingResponse:
+    chunks = _csv_chunks if export_format == ExportFormat.CSV \
+        else _ndjson_chunks
+    return StreamingResponse(
+        chunks(rows, serializer),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            'Content-Disposition':
+                f'attachment; filename="{filename}.{export_format.value}"'
+        }
+    )
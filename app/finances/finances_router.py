@@ -1,10 +1,14 @@
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, UploadFile
 
+from app.auth.serializer import Principal
 from app.auth.service import get_current_user
-from app.finances.serializer import Finance, Period, CreateFinance
+from app.export import ExportFormat, export_response
+from app.finances.serializer import Finance, Period, CreateFinance, FinanceImport
 from app.finances.service import FinanceService
+from app.pagination import Pagination, Page
+from app.serialization import rows_page_response
 
 router = APIRouter(
     prefix='/finances',
@@ -12,34 +16,80 @@ router = APIRouter(
 )
 
 
-@router.get('/', response_model=List[Finance])
-def get_finances(
+@router.get('/', response_model=Page[Finance])
+async def get_finances(
         period: Period = Depends(),
-        user_id: int = Depends(get_current_user),
+        pagination: Pagination = Depends(),
+        principal: Principal = Depends(get_current_user),
         service: FinanceService = Depends()
 ):
-    return service.get_finances(user_id=user_id, period=period)
+    page = await service.get_finances(
+        principal=principal,
+        period=period,
+        pagination=pagination
+    )
+    return rows_page_response(page, Finance)
+
+
+@router.get('/export')
+async def export_finances(
+        export_format: ExportFormat = Query(ExportFormat.NDJSON, alias='format'),
+        period: Period = Depends(),
+        principal: Principal = Depends(get_current_user),
+        service: FinanceService = Depends()
+):
+    rows = await service.stream_finances(principal=principal, period=period)
+    return export_response(
+        rows=rows,
+        serializer=Finance,
+        export_format=export_format,
+        filename='finances'
+    )
 
 
 @router.post('/', response_model=Finance)
-def create_finance(
+async def create_finance(
         data: CreateFinance,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
+        service: FinanceService = Depends()
+):
+    return await service.create_finances(
+        principal=principal,
+        data=data
+    )
+
+
+@router.post('/import', response_model=FinanceImport)
+async def import_finances(
+        data: List[CreateFinance],
+        principal: Principal = Depends(get_current_user),
         service: FinanceService = Depends()
 ):
-    return service.create_finances(
-        user_id=user_id,
+    return await service.import_finances(
+        principal=principal,
         data=data
     )
 
 
+@router.post('/import/csv', response_model=FinanceImport)
+async def import_finances_csv(
+        file: UploadFile,
+        principal: Principal = Depends(get_current_user),
+        service: FinanceService = Depends()
+):
+    return await service.import_finances(
+        principal=principal,
+        data=await service.read_csv(file)
+    )
+
+
 @router.post('/replenish_balance', response_model=Finance)
-def replenish_balance(
+async def replenish_balance(
         data: CreateFinance,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: FinanceService = Depends()
 ):
-    return service.replenish_balance(
-        user_id=user_id,
+    return await service.replenish_balance(
+        principal=principal,
         data=data
     )
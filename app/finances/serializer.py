@@ -4,15 +4,16 @@ from decimal import Decimal
 from pydantic import BaseModel
 
 from app.database.enums import TransactionType
+from app.dates import NaiveDatetime
 
 
 class Period(BaseModel):
-    from_date: datetime = datetime.now() - timedelta(days=7)
-    to_date: datetime = datetime.now() + timedelta(days=7)
+    from_date: NaiveDatetime = datetime.now() - timedelta(days=7)
+    to_date: NaiveDatetime = datetime.now() + timedelta(days=7)
 
 
 class BaseFinance(BaseModel):
-    date: datetime = datetime.now()
+    date: NaiveDatetime = datetime.now()
     transaction_type: TransactionType
     amount: Decimal
 
@@ -31,3 +32,9 @@ class CreateFinance(BaseFinance):
 
 class UpdateFinance(BaseFinance):
     pass
+
+
+class FinanceImport(BaseModel):
+    count: int
+    income: Decimal
+    expense: Decimal
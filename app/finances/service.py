@@ -1,65 +1,151 @@
+import csv
+import io
 from decimal import Decimal
 from typing import List
 
-from fastapi import Depends
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from fastapi import Depends, HTTPException, UploadFile, status
+from pydantic import ValidationError
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
 
 from app import utils
+from app.auth.serializer import Principal
 from app.balance.service import BalanceService
 from app.budget.service import BudgetService
 from app.database import models
 from app.database.database import get_session
 from app.database.enums import UserRole, TransactionType
-from app.finances.serializer import Period, CreateFinance
+from app.export import YIELD_PER
+from app.finances.serializer import Period, CreateFinance, Finance
+from app.pagination import Pagination, paginate
+from app.serialization import serializer_columns
 
 
 class FinanceService:
 
-    def __init__(self, session: Session = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
         self.session = session
 
-    def get_finances(
+    async def get_finances(
             self,
-            user_id: int,
-            period: Period
+            principal: Principal,
+            period: Period,
+            pagination: Pagination
     ):
-        company, _ = self._get_company(
-            user_id=user_id,
+        company, _ = await self._get_company(
+            principal=principal,
             permissions=[UserRole.ADMIN, UserRole.DIRECTOR]
         )
-        finance = (
-            self.session
-            .query(models.Finance)
-            .filter(
-                and_(
-                    models.Finance.company_id == company.id,
-                    models.Finance.date >= period.from_date,
-                    models.Finance.date < period.to_date
-                )
-            )
-            # .order_by(desc(models.Finance.date))
-            .all()
+        return await paginate(
+            session=self.session,
+            query=self._finances_query(company, period),
+            model=models.Finance,
+            pagination=pagination,
+            rows=True
+        )
+
+    async def stream_finances(
+            self,
+            principal: Principal,
+            period: Period
+    ) -> AsyncResult:
+        company, _ = await self._get_company(
+            principal=principal,
+            permissions=[UserRole.ADMIN, UserRole.DIRECTOR]
         )
-        return finance
 
-    def create_finances(
+        return await self.session.stream(
+            self._finances_query(company, period)
+            .order_by(models.Finance.date, models.Finance.id),
+            execution_options={'yield_per': YIELD_PER}
+        )
+
+    async def create_finances(
             self,
-            user_id: int,
+            principal: Principal,
             data: CreateFinance
     ):
-        finance, company = self._create_finance(user_id, data)
+        async with self.session.begin():
+            finance, company = await self._create_finance(principal, data)
         return finance
 
-    def replenish_balance(
+    async def import_finances(
             self,
-            user_id: int,
+            principal: Principal,
+            data: List[CreateFinance]
+    ) -> dict:
+        """
+        Adds all lines in one transaction. Finances and history are
+        inserted in batches and the budget is changed by their sums
+        with one UPDATE, history is built the same way as line by line.
+        """
+        income = expense = Decimal(0)
+        async with self.session.begin():
+            company, _ = await self._get_company(
+                principal,
+                permissions=[UserRole.ADMIN, UserRole.DIRECTOR]
+            )
+
+            finances = []
+            finance_ids = await self._reserve_finance_ids(len(data))
+            for finance_id, item in zip(finance_ids, data):
+                finance = models.Finance(
+                    **item.dict(),
+                    id=finance_id,
+                    company_id=company.id
+                )
+                self.session.add(finance)
+                finances.append(finance)
+
+                if finance.transaction_type == TransactionType.INCOME:
+                    income += finance.amount
+                else:
+                    expense += finance.amount
+
+            budget_history = await BudgetService.change_budget(
+                session=self.session,
+                budget=company.budget,
+                finances=finances
+            )
+            self.session.add_all(budget_history)
+
+        return {'count': len(data), 'income': income, 'expense': expense}
+
+    async def _reserve_finance_ids(self, count: int) -> List[int]:
+        # History rows refer to finances, so their ids are needed before insert
+        if not count:
+            return []
+        result = await self.session.scalars(
+            select(func.nextval('finances_id_seq'))
+            .select_from(func.generate_series(1, count))
+        )
+        return result.all()
+
+    @classmethod
+    async def read_csv(cls, file: UploadFile) -> List[CreateFinance]:
+        # Columns as in the CSV export, others are ignored
+        content = (await file.read()).decode('utf-8-sig')
+        data = []
+        for line, row in enumerate(csv.DictReader(io.StringIO(content)), start=2):
+            try:
+                data.append(CreateFinance.parse_obj(row))
+            except ValidationError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Ошибка в строке {line}: {e.errors()}"
+                )
+        return data
+
+    async def replenish_balance(
+            self,
+            principal: Principal,
             data: CreateFinance
     ):
         try:
-            with self.session.begin():
-                finance, company = self._create_finance(user_id, data)
-                balance, balance_history = BalanceService.change_balance(
+            async with self.session.begin():
+                finance, company = await self._create_finance(principal, data)
+                balance, balance_history = await BalanceService.change_balance(
+                    session=self.session,
                     amount=Decimal(finance.amount),
                     transaction_type=TransactionType.INCOME,
                     date=finance.date,
@@ -71,52 +157,72 @@ class FinanceService:
         except Exception as e:
             raise e
 
-    def _get_company(
+    @classmethod
+    def _finances_query(
+            cls,
+            company: models.Company,
+            period: Period
+    ):
+        return (
+            select(*serializer_columns(models.Finance, Finance))
+            .filter(
+                and_(
+                    models.Finance.company_id == company.id,
+                    models.Finance.date >= period.from_date,
+                    models.Finance.date < period.to_date
+                )
+            )
+        )
+
+    async def _get_company(
             self,
-            user_id: int,
+            principal: Principal,
             permissions: List[UserRole]
     ) -> tuple[models.Company, models.User]:
-        user = utils.check_user_permission(
+        user = await utils.check_user_permission(
             session=self.session,
-            user_id=user_id,
+            principal=principal,
             permissions=permissions
         )
         return user.company, user
 
-    def _create_finance(
+    async def _create_finance(
             self,
-            user_id: int,
+            principal: Principal,
             data: CreateFinance
     ):
         try:
-            with self.session.begin_nested():
-                company, _ = self._get_company(
-                    user_id,
+            async with self.session.begin_nested():
+                company, _ = await self._get_company(
+                    principal,
                     permissions=[UserRole.ADMIN, UserRole.DIRECTOR]
                 )
-                finance, budget, budget_history = self.create_finance(
+                finance, budget_history = await self.create_finance(
+                    session=self.session,
                     data=data,
                     company=company
                 )
                 self.session.add(budget_history)
-                self.session.add(finance)
                 return finance, company
         except Exception as e:
             raise e
 
     @classmethod
-    def create_finance(
+    async def create_finance(
             cls,
+            session: AsyncSession,
             data: CreateFinance,
             company: models.Company,
-    ) -> tuple[models.Finance, models.Budget, models.BudgetHistory]:
+    ) -> tuple[models.Finance, models.BudgetHistory]:
         finance = models.Finance(
             **data.dict(),
             company_id=company.id,
         )
+        session.add(finance)
 
-        budget, budget_history = BudgetService.change_budget(
+        budget_history, = await BudgetService.change_budget(
+            session=session,
             budget=company.budget,
-            finance=finance
+            finances=[finance]
         )
-        return finance, budget, budget_history
+        return finance, budget_history
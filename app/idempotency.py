@@ -0,0 +1,218 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+from fastapi.security.utils import get_authorization_scheme_param
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth.service import AuthService
+from app.database import models
+from app.database.database import Session
+from app.settings import settings
+
+HEADER = 'idempotency-key'
+# Errors a retry may fix, their responses aren't kept
+RETRYABLE_STATUSES = {409, 429, 503}
+PURGE_BATCH = 100
+MAX_KEY_LENGTH = models.IdempotencyKey.key.type.length
+
+
+class IdempotencyMiddleware:
+    """
+    Makes a POST sent with the Idempotency-Key header safe to retry.
+    The first request reserves the key of its user and its response is
+    saved, a retry with the same key and body gets the saved response
+    without running the endpoint again.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] != 'POST':
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        key = headers.get(HEADER)
+        # Most POSTs have no key, their token isn't verified twice
+        if key is None:
+            return await self.app(scope, receive, send)
+        user_id = await self._get_user_id(headers)
+        if user_id is None:
+            return await self.app(scope, receive, send)
+
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await JSONResponse(
+                status_code=400,
+                content={
+                    'detail': f'Ключ идемпотентности должен быть непустым и '
+                              f'не длиннее {MAX_KEY_LENGTH} символов'
+                }
+            )(scope, receive, send)
+
+        body = await self._read_body(receive)
+        request_hash = hashlib.sha256(
+            scope['path'].encode() + b'?' + scope['query_string'] + b'\n' + body
+        ).hexdigest()
+
+        record = await self._reserve(user_id, key, request_hash)
+        if record is not None:
+            return await self._replay(record, request_hash)(scope, receive, send)
+
+        response = {}
+
+        async def receive_body() -> Message:
+            if 'sent' not in response:
+                response['sent'] = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            return await receive()
+
+        async def send_and_keep(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['media_type'] = Headers(raw=message['headers']).get('content-type')
+                response['body'] = b''
+            elif message['type'] == 'http.response.body':
+                response['body'] += message.get('body', b'')
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_and_keep)
+        except Exception:
+            await self._release(user_id, key)
+            raise
+
+        status_code = response.get('status', 500)
+        if status_code >= 500 or status_code in RETRYABLE_STATUSES:
+            await self._release(user_id, key)
+        else:
+            await self._save(user_id, key, status_code, response)
+
+    @classmethod
+    async def _get_user_id(cls, headers: Headers) -> Optional[int]:
+        # Requests without a valid token are left to the endpoint
+        scheme, token = get_authorization_scheme_param(headers.get('authorization'))
+        if scheme.lower() != 'bearer' or not token:
+            return None
+        try:
+            payload = await AuthService.verify_token(token)
+        except HTTPException:
+            return None
+        return int(payload['sub'])
+
+    @classmethod
+    async def _read_body(cls, receive: Receive) -> bytes:
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+        return body
+
+    @classmethod
+    async def _reserve(
+            cls,
+            user_id: int,
+            key: str,
+            request_hash: str
+    ) -> Optional[models.IdempotencyKey]:
+        """
+        Inserts the key, or takes over an expired one. Returns None when
+        the request has to be run, otherwise the record of the key.
+        """
+        now = datetime.now()
+        expired = now - timedelta(hours=settings.idempotency_key_ttl_hours)
+        table = models.IdempotencyKey.__table__
+        async with Session() as session, session.begin():
+            statement = insert(table).values(
+                user_id=user_id,
+                key=key,
+                request_hash=request_hash,
+                created_at=now
+            )
+            reserved = await session.scalar(
+                statement.on_conflict_do_update(
+                    index_elements=[table.c.user_id, table.c.key],
+                    set_={
+                        'request_hash': statement.excluded.request_hash,
+                        'created_at': statement.excluded.created_at,
+                        'status_code': None,
+                        'response': None,
+                        'media_type': None,
+                    },
+                    where=table.c.created_at < expired
+                )
+                .returning(table.c.id)
+            )
+            if reserved:
+                await session.execute(
+                    delete(models.IdempotencyKey)
+                    .where(models.IdempotencyKey.id.in_(
+                        select(models.IdempotencyKey.id)
+                        .filter(models.IdempotencyKey.created_at < expired)
+                        .limit(PURGE_BATCH)
+                    ))
+                    .execution_options(synchronize_session=False)
+                )
+                return None
+
+            return await session.scalar(
+                select(models.IdempotencyKey)
+                .filter_by(user_id=user_id, key=key)
+            )
+
+    @classmethod
+    def _replay(cls, record: models.IdempotencyKey, request_hash: str) -> Response:
+        if record.request_hash != request_hash:
+            return JSONResponse(
+                status_code=422,
+                content={'detail': 'Ключ идемпотентности уже использован для другого запроса'}
+            )
+        if record.status_code is None:
+            return JSONResponse(
+                status_code=409,
+                content={'detail': 'Запрос с этим ключом идемпотентности еще выполняется'}
+            )
+        return Response(
+            content=record.response,
+            status_code=record.status_code,
+            media_type=record.media_type,
+            headers={'Idempotent-Replayed': 'true'}
+        )
+
+    @classmethod
+    async def _save(cls, user_id: int, key: str, status_code: int, response: dict) -> None:
+        async with Session() as session, session.begin():
+            await session.execute(
+                update(models.IdempotencyKey)
+                .where(
+                    models.IdempotencyKey.user_id == user_id,
+                    models.IdempotencyKey.key == key
+                )
+                .values(
+                    status_code=status_code,
+                    response=response['body'].decode(),
+                    media_type=response['media_type']
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+    @classmethod
+    async def _release(cls, user_id: int, key: str) -> None:
+        # The request failed, a retry with the key runs it again
+        async with Session() as session, session.begin():
+            await session.execute(
+                delete(models.IdempotencyKey)
+                .where(
+                    models.IdempotencyKey.user_id == user_id,
+                    models.IdempotencyKey.key == key
+                )
+                .execution_options(synchronize_session=False)
+            )
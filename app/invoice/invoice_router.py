@@ -1,11 +1,14 @@
-from typing import List, Union
+from typing import List
 
 from fastapi import APIRouter, Depends
 
+from app.auth.serializer import Principal
 from app.auth.service import get_current_user
 from app.database.enums import BalanceType
-from app.invoice.serializer import CreateCompanyInvoice, CreateUserInvoice, CompanyInvoice, UserInvoice
+from app.invoice.serializer import CreateCompanyInvoice, CreateUserInvoice, CompanyInvoice, UserInvoice, UserInvoiceResult
 from app.invoice.service import InvoiceService
+from app.pagination import Pagination, Page
+from app.serialization import Fields, fieldset, model_page_response
 
 router = APIRouter(
     prefix='/invoices',
@@ -14,25 +17,32 @@ router = APIRouter(
 
 
 @router.get('/user/{invoice_id}', response_model=UserInvoice)
-def get_user_invoice(
+async def get_user_invoice(
         invoice_id: int,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: InvoiceService = Depends()
 ):
-    return service.get_user_invoice(
+    return await service.get_user_invoice(
         invoice_id=invoice_id,
-        user_id=user_id
+        principal=principal
     )
 
 
-@router.get('/user', response_model=List[UserInvoice])
-def get_user_invoices(
-        user_id: int = Depends(get_current_user),
+@router.get('/user', response_model=Page[UserInvoice])
+async def get_user_invoices(
+        pagination: Pagination = Depends(),
+        fields: Fields = Depends(fieldset(UserInvoice)),
+        principal: Principal = Depends(get_current_user),
         service: InvoiceService = Depends()
 ):
-    return service.get_user_invoices(
-        user_id=user_id
+    page = await service.get_user_invoices(
+        principal=principal,
+        pagination=pagination,
+        fields=fields
     )
+    if fields is None:
+        return page
+    return model_page_response(page, UserInvoice, fields)
 
 
 @router.get(
@@ -40,29 +50,36 @@ def get_user_invoices(
     response_model=CompanyInvoice,
     response_model_by_alias=False
 )
-def get_company_invoice(
+async def get_company_invoice(
         invoice_id: int,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: InvoiceService = Depends()
 ):
-    return service.get_company_invoice(
+    return await service.get_company_invoice(
         invoice_id=invoice_id,
-        user_id=user_id
+        principal=principal
     )
 
 
 @router.get(
     '/company/',
-    response_model=List[CompanyInvoice],
+    response_model=Page[CompanyInvoice],
     response_model_by_alias=False
 )
-def get_company_invoices(
-        user_id: int = Depends(get_current_user),
+async def get_company_invoices(
+        pagination: Pagination = Depends(),
+        fields: Fields = Depends(fieldset(CompanyInvoice, by_alias=False)),
+        principal: Principal = Depends(get_current_user),
         service: InvoiceService = Depends()
 ):
-    return service.get_company_invoices(
-        user_id=user_id
+    page = await service.get_company_invoices(
+        principal=principal,
+        pagination=pagination,
+        fields=fields
     )
+    if fields is None:
+        return page
+    return model_page_response(page, CompanyInvoice, fields, by_alias=False)
 
 
 @router.post(
@@ -70,29 +87,41 @@ def get_company_invoices(
     response_model=CompanyInvoice,
     response_model_by_alias=False
 )
-def pay_for_company(
+async def pay_for_company(
         data: CreateCompanyInvoice,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: InvoiceService = Depends()
 ):
-    return service.create_company_invoice(
+    return await service.create_company_invoice(
         data=data,
-        user_id=user_id
+        principal=principal
     )
 
 
 @router.post('/user', response_model=UserInvoice)
-def pay_for_user(
+async def pay_for_user(
         data: CreateUserInvoice,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: InvoiceService = Depends()
 ):
-    invoice, products_data = service.create_user_invoice(
+    invoice, products_data = await service.create_user_invoice(
         data=data,
-        user_id=user_id
+        principal=principal
     )
 
     inv: UserInvoice = UserInvoice.from_orm(invoice)
     inv.products = products_data
 
     return inv
+
+
+@router.post('/user/batch', response_model=List[UserInvoiceResult])
+async def pay_for_user_batch(
+        data: List[CreateUserInvoice],
+        principal: Principal = Depends(get_current_user),
+        service: InvoiceService = Depends()
+):
+    return await service.create_user_invoices(
+        data=data,
+        principal=principal
+    )
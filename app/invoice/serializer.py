@@ -4,12 +4,13 @@ from typing import List, Optional
 
 from pydantic import BaseModel
 
+from app.dates import NaiveDatetime
 from app.products.serializer import Product, CreateProduct, SellProducts, InvoiceProduct
 from app.worker.serializer import InvoiceWorker
 
 
 class BaseInvoice(BaseModel):
-    date: datetime = datetime.now()
+    date: NaiveDatetime = datetime.now()
     # quantity: float
 
 
@@ -44,3 +45,10 @@ class CreateCompanyInvoice(BaseInvoice):
 class CreateUserInvoice(BaseInvoice):
     user_id: Optional[int] = None
     products: Optional[List[SellProducts]] = None
+
+
+class UserInvoiceResult(BaseModel):
+    # Result of one invoice of a batch, in the order they were sent
+    index: int
+    invoice: Optional[UserInvoice] = None
+    errors: Optional[List[str]] = None
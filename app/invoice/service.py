@@ -1,37 +1,53 @@
+from typing import List
+
 from fastapi import Depends, HTTPException, status
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, joinedload, load_only
 
 from app import utils
+from app.auth.serializer import Principal
 from app.balance.service import BalanceService
+from app.budget.service import BudgetService
 from app.database import models
 from app.database.database import get_session
 from app.database.enums import TransactionType, UserRole
 from app.finances.serializer import CreateFinance
 from app.finances.service import FinanceService
-from app.invoice.serializer import CreateCompanyInvoice, CreateUserInvoice, UserInvoice
+from app.invoice.serializer import CreateCompanyInvoice, CreateUserInvoice, UserInvoice, UserInvoiceResult
+from app.pagination import Pagination, paginate
+from app.products.cache import catalogue
 from app.products.service import ProductService
+from app.serialization import Fields
 
 
 class InvoiceService:
+    # Loader strategies match relations read by the serializers:
+    # UserInvoice shows products and worker, CompanyInvoice only products.
+    # Products are loaded with one IN query per page of invoices,
+    # worker is many-to-one and is joined into the main query.
+    USER_INVOICE_RELATIONS = {
+        'products': selectinload(models.Invoice.products),
+        'worker': joinedload(models.Invoice.worker)
+    }
+    COMPANY_INVOICE_RELATIONS = {
+        'products': selectinload(models.Invoice.products)
+    }
+    USER_INVOICE_OPTIONS = list(USER_INVOICE_RELATIONS.values())
+    COMPANY_INVOICE_OPTIONS = list(COMPANY_INVOICE_RELATIONS.values())
 
-    def __init__(self, session: Session = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
         self.session = session
 
-    def get_user_invoice(
+    async def get_user_invoice(
             self,
             invoice_id: int,
-            user_id: int,
+            principal: Principal,
     ):
-        user = utils.get_in_db(
-            session=self.session,
-            model=models.User,
-            ident=user_id
-        )
-        invoice = (
-            self.session.query(models.Invoice)
-            .filter_by(id=invoice_id, user_id=user.id)
-            .first()
+        invoice = await self.session.scalar(
+            select(models.Invoice)
+            .filter_by(id=invoice_id, user_id=principal.id)
+            .options(*self.USER_INVOICE_OPTIONS)
         )
         if not invoice:
             raise HTTPException(
@@ -41,43 +57,41 @@ class InvoiceService:
 
         return invoice
 
-    def get_user_invoices(
+    async def get_user_invoices(
             self,
-            user_id: int,
+            principal: Principal,
+            pagination: Pagination,
+            fields: Fields = None
     ):
-        user = utils.get_in_db(
+        return await paginate(
             session=self.session,
-            model=models.User,
-            ident=user_id
+            query=select(models.Invoice)
+            .filter_by(user_id=principal.id)
+            .options(*self._load_options(self.USER_INVOICE_RELATIONS, fields)),
+            model=models.Invoice,
+            pagination=pagination
         )
 
-        return (
-            self.session.query(models.Invoice)
-            .filter_by(user_id=user.id)
-            .all()
-        )
-
-    def get_company_invoice(
+    async def get_company_invoice(
             self,
             invoice_id: int,
-            user_id: int,
+            principal: Principal,
     ):
-        user = utils.check_user_permission(
-            session=self.session,
-            user_id=user_id,
+        user = utils.check_principal_permission(
+            principal=principal,
             permissions=[
                 UserRole.DIRECTOR, UserRole.ADMIN,
                 UserRole.WORKER_DIRECTOR, UserRole.WORKER_ADMIN
             ]
         )
-        invoice = (
-            self.session.query(models.Invoice)
+        invoice = await self.session.scalar(
+            select(models.Invoice)
             .filter_by(id=invoice_id)
             .filter(or_(
                 models.Invoice.user_id == user.company_id,
                 models.Invoice.company_id == user.company_id
             ))
-            .first()
+            .options(*self.COMPANY_INVOICE_OPTIONS)
         )
         if not invoice:
             raise HTTPException(
@@ -87,38 +101,42 @@ class InvoiceService:
 
         return invoice
 
-    def get_company_invoices(
+    async def get_company_invoices(
             self,
-            user_id: int,
+            principal: Principal,
+            pagination: Pagination,
+            fields: Fields = None
     ):
-        user = utils.check_user_permission(
-            session=self.session,
-            user_id=user_id,
+        user = utils.check_principal_permission(
+            principal=principal,
             permissions=[
                 UserRole.DIRECTOR, UserRole.ADMIN,
                 UserRole.WORKER_DIRECTOR, UserRole.WORKER_ADMIN
             ]
         )
 
-        return (
-            self.session.query(models.Invoice)
+        return await paginate(
+            session=self.session,
+            query=select(models.Invoice)
             .filter(or_(
                 models.Invoice.user_id == user.company_id,
                 models.Invoice.company_id == user.company_id
             ))
-            .all()
+            .options(*self._load_options(self.COMPANY_INVOICE_RELATIONS, fields)),
+            model=models.Invoice,
+            pagination=pagination
         )
 
-    def create_company_invoice(
+    async def create_company_invoice(
             self,
             data: CreateCompanyInvoice,
-            user_id: int
+            principal: Principal
     ) -> models.Invoice:
         try:
-            with self.session.begin():
-                user = utils.check_user_permission(
+            async with self.session.begin():
+                user = await utils.check_user_permission(
                     session=self.session,
-                    user_id=user_id,
+                    principal=principal,
                     permissions=[UserRole.DIRECTOR, UserRole.ADMIN]
                 )
 
@@ -129,7 +147,7 @@ class InvoiceService:
                 )
 
                 if products_data:
-                    products, user, to_pay = ProductService.create_products(
+                    products, user, to_pay = await ProductService.create_products(
                         session=self.session,
                         data=products_data,
                         user=user
@@ -138,7 +156,8 @@ class InvoiceService:
 
                 self.session.add(invoice)
 
-                balance, balance_history = BalanceService.change_balance(
+                balance, balance_history = await BalanceService.change_balance(
+                    session=self.session,
                     amount=to_pay,
                     transaction_type=TransactionType.EXPENSE,
                     date=data.date,
@@ -147,33 +166,30 @@ class InvoiceService:
                 )
                 invoice.to_pay = to_pay
                 self.session.add(balance_history)
-
-                return invoice
         except Exception as e:
-            self.session.rollback()
+            await self.session.rollback()
             raise e
 
-    def create_user_invoice(
+        await catalogue.invalidate(user.company_id)
+        return invoice
+
+    async def create_user_invoice(
             self,
             data: CreateUserInvoice,
-            user_id: int
+            principal: Principal
     ):
         try:
-            with self.session.begin():
+            async with self.session.begin():
                 exclude = {'products'}
                 buyer = None
                 if data.user_id:
-                    buyer = utils.get_in_db(
-                        session=self.session,
-                        model=models.User,
-                        ident=data.user_id
-                    )
+                    buyer = await utils.get_user(self.session, data.user_id)
                 else:
                     exclude.update({'user_id'})
 
-                products, products_data, user, to_pay = ProductService.sell_products(
+                products, products_data, user, to_pay = await ProductService.sell_products(
                     session=self.session,
-                    user_id=user_id,
+                    principal=principal,
                     data=data.products,
                 )
 
@@ -181,13 +197,14 @@ class InvoiceService:
                     **data.dict(exclude=exclude),
                     to_pay=to_pay,
                     company_id=user.company_id,
-                    worker_id=user.worker_id,
+                    worker=user.worker,
                     products=products
                 )
                 self.session.add(invoice)
 
                 if buyer:
-                    balance, balance_history = BalanceService.change_balance(
+                    balance, balance_history = await BalanceService.change_balance(
+                        session=self.session,
                         amount=to_pay,
                         transaction_type=TransactionType.EXPENSE,
                         date=data.date,
@@ -202,13 +219,151 @@ class InvoiceService:
                     amount=to_pay
                 )
 
-                finance, budget, budget_history = FinanceService.create_finance(
+                finance, budget_history = await FinanceService.create_finance(
+                    session=self.session,
                     data=finance_data,
                     company=user.company
                 )
-                self.session.add(finance)
                 self.session.add(budget_history)
-                return invoice, products_data
         except Exception as e:
-            self.session.rollback()
+            await self.session.rollback()
+            raise e
+
+        await catalogue.invalidate(user.company_id)
+        return invoice, products_data
+
+    async def create_user_invoices(
+            self,
+            data: List[CreateUserInvoice],
+            principal: Principal
+    ) -> List[UserInvoiceResult]:
+        """
+        Sales queued by an offline terminal. Products and buyers are
+        loaded and locked once for the whole batch, the budget is
+        changed once by the income of all sales and the inserts are
+        flushed together. A sale which can't be made is reported in
+        its result and doesn't stop the others.
+        """
+        results = []
+        created = []
+        finances = []
+        try:
+            async with self.session.begin():
+                user = await utils.check_user_permission(
+                    session=self.session,
+                    principal=principal,
+                    permissions=[UserRole.WORKER_USER, UserRole.WORKER_ADMIN]
+                )
+                stock = await ProductService.lock_products(
+                    self.session,
+                    {
+                        item.product_id
+                        for invoice_data in data
+                        for item in invoice_data.products or []
+                    }
+                )
+                buyers = await self._get_buyers(
+                    {invoice_data.user_id for invoice_data in data if invoice_data.user_id}
+                )
+                for index, invoice_data in enumerate(data):
+                    exclude = {'products'}
+                    buyer = None
+                    if invoice_data.user_id:
+                        buyer = buyers.get(invoice_data.user_id)
+                        if not buyer:
+                            results.append(UserInvoiceResult(
+                                index=index,
+                                errors=[
+                                    f"Пользователя с идентификатором "
+                                    f"{invoice_data.user_id} нет в базе!"
+                                ]
+                            ))
+                            continue
+                    else:
+                        exclude.update({'user_id'})
+
+                    try:
+                        products, products_data, to_pay = ProductService.take_from_stock(
+                            stock, invoice_data.products or []
+                        )
+                    except HTTPException as e:
+                        results.append(UserInvoiceResult(index=index, errors=e.detail))
+                        continue
+
+                    invoice = models.Invoice(
+                        **invoice_data.dict(exclude=exclude),
+                        to_pay=to_pay,
+                        company_id=user.company_id,
+                        worker=user.worker,
+                        products=products
+                    )
+                    self.session.add(invoice)
+
+                    if buyer:
+                        balance, balance_history = await BalanceService.change_balance(
+                            session=self.session,
+                            amount=to_pay,
+                            transaction_type=TransactionType.EXPENSE,
+                            date=invoice_data.date,
+                            balance=buyer.balance,
+                            invoice=invoice
+                        )
+                        self.session.add(balance_history)
+
+                    finance = models.Finance(
+                        date=invoice_data.date,
+                        transaction_type=TransactionType.INCOME,
+                        amount=to_pay,
+                        company_id=user.company_id
+                    )
+                    self.session.add(finance)
+                    finances.append(finance)
+
+                    result = UserInvoiceResult(index=index)
+                    results.append(result)
+                    created.append((result, invoice, products_data))
+
+                budget_history = await BudgetService.change_budget(
+                    session=self.session,
+                    budget=user.company.budget,
+                    finances=finances
+                )
+                self.session.add_all(budget_history)
+        except Exception as e:
+            await self.session.rollback()
             raise e
+
+        if created:
+            await catalogue.invalidate(user.company_id)
+
+        # Invoices have ids after the commit
+        for result, invoice, products_data in created:
+            result.invoice = UserInvoice.from_orm(invoice)
+            result.invoice.products = products_data
+
+        return results
+
+    @classmethod
+    def _load_options(cls, relations: dict, fields: Fields) -> list:
+        # Only the requested columns and relations, date is for the cursor
+        if fields is None:
+            return list(relations.values())
+
+        columns = [
+            getattr(models.Invoice, name) for name in fields
+            if name not in relations
+        ]
+        return [
+            load_only(models.Invoice.date, *columns),
+            *[relations[name] for name in fields if name in relations]
+        ]
+
+    async def _get_buyers(self, user_ids: set) -> dict:
+        if not user_ids:
+            return {}
+        result = await self.session.scalars(
+            select(models.User)
+            .options(*utils.USER_OPTIONS)
+            .filter(models.User.id.in_(user_ids))
+        )
+        return {user.id: user for user in result.unique().all()}
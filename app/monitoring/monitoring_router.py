@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends
+
+from app import utils
+from app.auth.serializer import Principal
+from app.auth.service import get_current_user
+from app.database.enums import UserRole
+from app.monitoring.serializer import CacheStatus, PoolStatus
+from app.monitoring.service import MonitoringService
+
+router = APIRouter(
+    prefix='/monitoring',
+    tags=['Мониторинг']
+)
+
+
+def check_monitoring_permission(
+        principal: Principal = Depends(get_current_user)
+) -> Principal:
+    return utils.check_principal_permission(
+        principal=principal,
+        permissions=[UserRole.DIRECTOR, UserRole.ADMIN]
+    )
+
+
+@router.get('/pool', response_model=PoolStatus)
+async def get_pool_status(
+        principal: Principal = Depends(check_monitoring_permission)
+):
+    return MonitoringService.get_pool_status()
+
+
+@router.get('/cache', response_model=CacheStatus)
+async def get_cache_status(
+        principal: Principal = Depends(check_monitoring_permission)
+):
+    # Counters of the product catalogue cache in this process
+    return MonitoringService.get_cache_status()
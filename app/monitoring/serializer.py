@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+
+
+class PoolStatus(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_total: float
+    wait_avg: float
+    wait_max: float
+    wait_last: float
+
+
+class CacheStatus(BaseModel):
+    hits: int
+    misses: int
+    invalidations: int
+    hit_ratio: float
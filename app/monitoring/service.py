@@ -0,0 +1,34 @@
+from app.database.database import engine
+from app.database.pool import statistics
+from app.monitoring.serializer import CacheStatus, PoolStatus
+from app.products.cache import catalogue
+
+
+class MonitoringService:
+
+    @classmethod
+    def get_pool_status(cls) -> PoolStatus:
+        pool = engine.pool
+        return PoolStatus(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            # Negative while the pool hasn't opened all pool_size connections
+            overflow=max(pool.overflow(), 0),
+            checkouts=statistics.checkouts,
+            timeouts=statistics.timeouts,
+            wait_total=statistics.wait_total,
+            wait_avg=statistics.wait_avg,
+            wait_max=statistics.wait_max,
+            wait_last=statistics.wait_last
+        )
+
+    @classmethod
+    def get_cache_status(cls) -> CacheStatus:
+        lookups = catalogue.hits + catalogue.misses
+        return CacheStatus(
+            hits=catalogue.hits,
+            misses=catalogue.misses,
+            invalidations=catalogue.invalidations,
+            hit_ratio=catalogue.hits / lookups if lookups else 0
+        )
@@ -0,0 +1,104 @@
+import base64
+import json
+from bisect import bisect_right
+from datetime import datetime
+from typing import Generic, List, Optional, TypeVar
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, conint
+from pydantic.generics import GenericModel
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Base
+from app.dates import to_naive
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+MIN_IDENT, MAX_IDENT = -2 ** 31, 2 ** 31 - 1
+
+T = TypeVar('T')
+
+
+class Pagination(BaseModel):
+    cursor: Optional[str] = None
+    limit: conint(gt=0, le=MAX_LIMIT) = DEFAULT_LIMIT
+
+
+class Page(GenericModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(date: datetime, ident: int) -> str:
+    raw = json.dumps([date.isoformat(), ident]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        date, ident = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        # Ids are int4, a float, a bool or a bigger number is a forged cursor
+        if type(ident) is not int or not MIN_IDENT <= ident <= MAX_IDENT:
+            raise ValueError(f'Invalid cursor ident {ident!r}')
+        return to_naive(datetime.fromisoformat(date)), ident
+    except (ValueError, TypeError, OverflowError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации!"
+        )
+
+
+async def paginate(
+        session: AsyncSession,
+        query: Select,
+        model: Base,
+        pagination: Pagination,
+        rows: bool = False
+) -> dict:
+    """
+    Keyset pagination on (date, id) of the model.
+    Fetches one extra row to know whether the next page exists.
+    With rows the query selects columns and the page has their rows
+    instead of models, date and id are added after them if missing.
+    """
+    if rows:
+        selected = query.selected_columns.keys()
+        query = query.add_columns(*[
+            column for column in (model.date, model.id) if column.key not in selected
+        ])
+
+    if pagination.cursor:
+        date, ident = decode_cursor(pagination.cursor)
+        query = query.filter(tuple_(model.date, model.id) > tuple_(date, ident))
+
+    query = (
+        query
+        .order_by(model.date, model.id)
+        .limit(pagination.limit + 1)
+    )
+    result = await session.execute(query) if rows else await session.scalars(query)
+    items = result.all()
+
+    next_cursor = None
+    if len(items) > pagination.limit:
+        items = items[:pagination.limit]
+        next_cursor = encode_cursor(items[-1].date, items[-1].id)
+
+    return {'items': items, 'next_cursor': next_cursor}
+
+
+def paginate_items(items: List[dict], pagination: Pagination) -> dict:
+    """
+    Same keyset pagination for serialized items already sorted
+    by date and id, such as a cached catalogue.
+    """
+    keys = [(datetime.fromisoformat(item['date']), item['id']) for item in items]
+    start = bisect_right(keys, decode_cursor(pagination.cursor)) if pagination.cursor else 0
+    end = start + pagination.limit
+
+    next_cursor = None
+    if end < len(items):
+        next_cursor = encode_cursor(*keys[end - 1])
+
+    return {'items': items[start:end], 'next_cursor': next_cursor}
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import models
+from app.products.serializer import Product
+from app.redis import get_redis
+from app.serialization import serialize_rows, serializer_columns
+from app.settings import settings
+
+
+class CatalogueStorage(ABC):
+    """
+    Catalogues as JSON compatible dicts, so every storage returns the same.
+    Every key has a generation, deleting the key increments it. A value
+    read before the delete is set only if the generation is still the
+    one taken before reading it.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def generation(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: dict, ttl: int, generation: int) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+
+class MemoryCatalogueStorage(CatalogueStorage):
+    # LRU of the current process, entries expire after ttl seconds
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.generations = {}
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    async def generation(self, key: str) -> int:
+        return self.generations.get(key, 0)
+
+    async def set(self, key: str, value: dict, ttl: int, generation: int) -> None:
+        if self.maxsize <= 0 or self.generations.get(key, 0) != generation:
+            return
+        self.entries[key] = (value, time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self.generations[key] = self.generations.get(key, 0) + 1
+        self.entries.pop(key, None)
+
+
+class RedisCatalogueStorage(CatalogueStorage):
+    # Shared by all processes
+
+    @property
+    def client(self):
+        return get_redis()
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = await self.client.get(f'catalogue:{key}')
+        return json.loads(value) if value is not None else None
+
+    async def generation(self, key: str) -> int:
+        return int(await self.client.get(f'catalogue-generation:{key}') or 0)
+
+    async def set(self, key: str, value: dict, ttl: int, generation: int) -> None:
+        from redis.exceptions import WatchError
+
+        generation_key = f'catalogue-generation:{key}'
+        async with self.client.pipeline(transaction=True) as pipe:
+            # The transaction fails if a delete increments the generation
+            await pipe.watch(generation_key)
+            if int(await pipe.get(generation_key) or 0) != generation:
+                return
+            pipe.multi()
+            pipe.set(f'catalogue:{key}', json.dumps(value), ex=ttl)
+            try:
+                await pipe.execute()
+            except WatchError:
+                pass
+
+    async def delete(self, key: str) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(f'catalogue-generation:{key}')
+            pipe.delete(f'catalogue:{key}')
+            await pipe.execute()
+
+
+class ProductCatalogue:
+    """
+    Read-through cache of the products in stock of every company.
+    Services which change products invalidate it after their commit.
+    A catalogue read before an invalidation isn't stored after it,
+    so it can't replace the invalidated one.
+    """
+
+    def __init__(self, storage: CatalogueStorage, ttl: int):
+        self.storage = storage
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, session: AsyncSession, company_id: int) -> dict:
+        """
+        Returns the serialized products sorted by date and id, with
+        the version of the catalogue, a hash of its content.
+        """
+        key = str(company_id)
+        entry = await self.storage.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        generation = await self.storage.generation(key)
+        result = await session.execute(
+            select(*serializer_columns(models.Product, Product))
+            .filter(
+                and_(
+                    models.Product.company_id == company_id,
+                    models.Product.quantity > 0
+                )
+            )
+            .order_by(models.Product.date, models.Product.id)
+        )
+        items = serialize_rows(result.all(), Product)
+        entry = {
+            'version': hashlib.sha1(json.dumps(items).encode()).hexdigest(),
+            'items': items
+        }
+        await self.storage.set(key, entry, self.ttl, generation)
+        return entry
+
+    async def invalidate(self, company_id: int) -> None:
+        self.invalidations += 1
+        await self.storage.delete(str(company_id))
+
+
+catalogue = ProductCatalogue(
+    storage=(
+        RedisCatalogueStorage() if settings.redis_url
+        else MemoryCatalogueStorage(maxsize=settings.product_cache_size)
+    ),
+    ttl=settings.product_cache_ttl
+)
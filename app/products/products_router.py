@@ -1,10 +1,15 @@
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
 
+from app.auth.serializer import Principal
 from app.auth.service import get_current_user
+from app.etag import etag_matches, make_etag, not_modified
+from app.pagination import Pagination, Page
 from app.products.serializer import Product, UpdateProduct, UpdateProducts
 from app.products.service import ProductService
+from app.serialization import Fields, fieldset
 
 router = APIRouter(
     prefix='/products',
@@ -12,41 +17,50 @@ router = APIRouter(
 )
 
 
-@router.get('/', response_model=List[Product])
-def get_products(
-        user_id: int = Depends(get_current_user),
+@router.get('/', response_model=Page[Product])
+async def get_products(
+        request: Request,
+        pagination: Pagination = Depends(),
+        fields: Fields = Depends(fieldset(Product)),
+        principal: Principal = Depends(get_current_user),
         service: ProductService = Depends()
 ):
-    return service.get_products(user_id)
+    page, version = await service.get_products(principal, pagination, fields)
+    etag = make_etag(version, pagination.cursor, pagination.limit, fields)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # Items of the cached catalogue are serialized already
+    return JSONResponse(content=page, headers={'ETag': etag})
 
 
 @router.get('/{product_id}', response_model=Product)
-def get_product(
+async def get_product(
         product_id: int,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: ProductService = Depends()
 ):
-    return service.get_product(user_id, product_id)
+    return await service.get_product(principal, product_id)
 
 
 @router.put('/', response_model=List[Product])
-def update_products(
+async def update_products(
         data: List[UpdateProducts],
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: ProductService = Depends()
 ):
-    return service.update_products(user_id, data)
+    return await service.update_products(principal, data)
 
 
 @router.put('/{product_id}', response_model=Product)
-def update_product(
+async def update_product(
         product_id: int,
         data: UpdateProduct,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: ProductService = Depends()
 ):
-    return service.update_product(
-        user_id=user_id,
+    return await service.update_product(
+        principal=principal,
         product_id=product_id,
         data=data
     )
@@ -5,6 +5,7 @@ from typing import Optional
 from pydantic import BaseModel, Field
 
 from app.database.enums import UnitOfMeasureType
+from app.dates import NaiveDatetime
 
 
 class BaseProduct(BaseModel):
@@ -12,7 +13,7 @@ class BaseProduct(BaseModel):
     purchase_price: Decimal = Field(alias='price')
     quantity: float
     unit_of_measure: UnitOfMeasureType
-    date: datetime = datetime.now()
+    date: NaiveDatetime = datetime.now()
 
 
 class Product(BaseProduct):
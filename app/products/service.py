@@ -1,15 +1,20 @@
+from collections import defaultdict
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Optional, Dict, Iterable
 
 from fastapi import Depends, HTTPException, status
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, select, update, values, column, Integer, Numeric, Float
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import utils
+from app.auth.serializer import Principal
 from app.database import models
 from app.database.database import get_session
 from app.database.enums import UserRole
-from app.products.serializer import CreateProduct, UpdateProduct, UpdateProducts, SellProducts, InvoiceProduct
+from app.pagination import Pagination, paginate_items
+from app.products.cache import catalogue
+from app.products.serializer import Product, CreateProduct, UpdateProduct, UpdateProducts, SellProducts, InvoiceProduct
+from app.serialization import Fields, trim_items
 
 
 class ProductService:
@@ -19,121 +24,153 @@ class ProductService:
         UserRole.WORKER_USER
     ]
 
-    def __init__(self, session: Session = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
         self.session = session
 
-    def get_product(
+    async def get_product(
             self,
-            user_id: int,
+            principal: Principal,
             product_id: int,
             permissions: Optional[List[UserRole]] = None
     ) -> models.Product:
-        utils.check_user_permission(
-            session=self.session,
-            user_id=user_id,
+        utils.check_principal_permission(
+            principal=principal,
             permissions=permissions if permissions else self.PERMISSIONS
         )
 
-        return utils.get_in_db(
+        return await utils.get_in_db(
             session=self.session,
             model=models.Product,
             ident=product_id
         )
 
-    def get_products(
+    async def get_products(
             self,
-            user_id: int,
+            principal: Principal,
+            pagination: Pagination,
+            fields: Fields = None,
             permissions: Optional[List[UserRole]] = None
-    ):
-        user = utils.check_user_permission(
-            session=self.session,
-            user_id=user_id,
+    ) -> tuple[dict, str]:
+        user = utils.check_principal_permission(
+            principal=principal,
             permissions=permissions if permissions else self.PERMISSIONS
         )
 
-        return (
-            self.session
-            .query(models.Product)
-            .filter(
-                and_(
-                    models.Product.company_id == user.company_id,
-                    models.Product.quantity > 0
-                )
-            )
-            .all()
-        )
+        entry = await catalogue.get(session=self.session, company_id=user.company_id)
+        page = paginate_items(items=entry['items'], pagination=pagination)
+        # The whole catalogue is cached, fields are picked from it
+        page['items'] = trim_items(page['items'], Product, fields)
+        return page, entry['version']
 
-    def update_product(
+    async def update_product(
             self,
-            user_id: int,
+            principal: Principal,
             product_id: int,
             data: UpdateProduct
     ) -> models.Product:
-        product = self.get_product(
-            user_id=user_id,
+        product = await self.get_product(
+            principal=principal,
             product_id=product_id,
             permissions=[UserRole.DIRECTOR, UserRole.ADMIN]
         )
-        self._update_product(data=data, product=product)
+        await self._update_product(data=data, product=product)
+        await catalogue.invalidate(product.company_id)
 
         return product
 
-    def update_products(
+    async def update_products(
             self,
-            user_id: int,
+            principal: Principal,
             data: List[UpdateProducts]
     ) -> List[models.Product]:
-        products = []
-        for item in data:
-            product = self.get_product(
-                user_id=user_id,
-                product_id=item.product_id,
-                permissions=[UserRole.DIRECTOR, UserRole.ADMIN]
+        utils.check_principal_permission(
+            principal=principal,
+            permissions=[UserRole.DIRECTOR, UserRole.ADMIN]
+        )
+        # The last line wins for a repeated product, as before
+        items = {item.product_id: item for item in data}
+        if not items:
+            return []
+
+        data_values = values(
+            column('id', Integer),
+            column('sale_price', Numeric(20, 3)),
+            column('sale_quantity', Float),
+            name='data'
+        ).data([
+            (item.product_id, item.sale_price, item.sale_quantity)
+            for item in items.values()
+        ])
+
+        # One UPDATE ... FROM (VALUES ...) RETURNING for the whole list,
+        # either every product is updated or none of them.
+        async with self.session.begin():
+            result = await self.session.scalars(
+                update(models.Product)
+                .where(
+                    and_(
+                        models.Product.id == data_values.c.id,
+                        models.Product.company_id == principal.company_id
+                    )
+                )
+                .values(
+                    sale_price=data_values.c.sale_price,
+                    sale_quantity=data_values.c.sale_quantity
+                )
+                .returning(models.Product),
+                execution_options={
+                    'synchronize_session': False,
+                    'populate_existing': True
+                }
             )
-            self._update_product(item, product)
-            products.append(product)
+            products = {product.id: product for product in result.all()}
 
-        return products
+            missing = [ident for ident in items if ident not in products]
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Записей с идентификаторами {missing} нет в базе!"
+                )
 
-    def _update_product(
+        await catalogue.invalidate(principal.company_id)
+        return [products[ident] for ident in items]
+
+    async def _update_product(
             self,
             data: UpdateProduct,
             product: models.Product
     ):
         for field, value in data:
             setattr(product, field, value)
-        utils.update_in_db(self.session, product)
+        await utils.update_in_db(self.session, product)
 
     @classmethod
-    def create_products(
+    async def create_products(
             cls,
-            session: Session,
+            session: AsyncSession,
             data: List[CreateProduct],
             user: models.User,
     ) -> tuple[List[models.Product], models.User, Decimal]:
-        user = utils.check_user_permission(
+        user = await utils.check_user_permission(
             session=session,
             user=user,
             permissions=[UserRole.DIRECTOR, UserRole.ADMIN]
         )
-        products = []
+        known = await cls.lock_products_by_name(
+            session, {item.name for item in data}
+        )
+        products = {}
         to_pay = Decimal(0.0)
         for item in data:
-            product = (
-                session.query(models.Product)
-                .filter_by(name=item.name)
-                .first()
-            )
-
+            product = known.get(item.name)
             if product:
-                product = (
-                    session.query(models.Product)
-                    .filter_by(name=item.name)
-                    .first()
-                )
-
+                # A name repeated in the delivery stocks all of its lines
+                quantity = item.quantity
+                if item.name in products:
+                    quantity += product.quantity
                 for field, value in item:
                     setattr(product, field, value)
+                product.quantity = quantity
 
             else:
                 product = models.Product(
@@ -142,55 +179,61 @@ class ProductService:
                     sale_quantity=0,
                     company_id=user.company_id
                 )
+                known[item.name] = product
 
-            to_pay = product.purchase_price * Decimal(product.quantity)
-            products.append(product)
+            to_pay += item.purchase_price * Decimal(item.quantity)
+            products[item.name] = product
 
-        return products, user, to_pay
+        return list(products.values()), user, to_pay
 
     @classmethod
-    def sell_products(
+    async def sell_products(
             cls,
-            session: Session,
-            user_id: int,
+            session: AsyncSession,
+            principal: Principal,
             data: List[SellProducts]
     ) -> tuple[
         List[models.Product], List[InvoiceProduct],
         models.User, Decimal
     ]:
-        user = utils.check_user_permission(
+        user = await utils.check_user_permission(
             session=session,
-            user_id=user_id,
+            principal=principal,
             permissions=[UserRole.WORKER_USER, UserRole.WORKER_ADMIN]
         )
 
+        data = data or []
+        stock = await cls.lock_products(
+            session, {item.product_id for item in data}
+        )
+        products, products_data, to_pay = cls.take_from_stock(stock, data)
+
+        return products, products_data, user, to_pay
+
+    @classmethod
+    def take_from_stock(
+            cls,
+            stock: Dict[int, models.Product],
+            data: List[SellProducts]
+    ) -> tuple[List[models.Product], List[InvoiceProduct], Decimal]:
+        """
+        Checks the whole sale against locked products and only then
+        decrements them, so a rejected sale leaves the stock untouched.
+        """
+        quantities = defaultdict(float)
+        for item in data:
+            quantities[item.product_id] += item.quantity
+        cls.check_stock(stock, quantities)
+
         products = []
         products_data = []
         to_pay = Decimal(0.0)
 
         for item in data:
-            product: models.Product = utils.get_in_db(
-                session=session,
-                model=models.Product,
-                ident=item.product_id
-            )
-
-            if product.sale_quantity == 0:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Товар с названием {product.name} нет в наличии"
-                )
-            if product.sale_quantity < item.quantity:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Товар с названием {product.name} доступно "
-                           f"в таком количестве {product.sale_quantity} а "
-                           f"не {item.quantity}"
-                )
-
+            product = stock[item.product_id]
             product.quantity -= item.quantity
             product.sale_quantity -= item.quantity
-            to_pay = product.sale_price * Decimal(item.quantity)
+            to_pay += product.sale_price * Decimal(item.quantity)
 
             product_data = InvoiceProduct.from_orm(product)
             product_data.quantity = item.quantity
@@ -198,4 +241,73 @@ class ProductService:
 
             products.append(product)
 
-        return products, products_data, user, to_pay
+        return products, products_data, to_pay
+
+    @classmethod
+    async def lock_products(
+            cls,
+            session: AsyncSession,
+            product_ids: Iterable[int]
+    ) -> Dict[int, models.Product]:
+        """
+        Loads products with one SELECT ... FOR UPDATE. Rows are locked
+        in id order, so concurrent sales can't deadlock on each other
+        and can't sell the same stock twice until the transaction ends.
+        """
+        result = await session.scalars(
+            select(models.Product)
+            .filter(models.Product.id.in_(list(product_ids)))
+            .order_by(models.Product.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        return {product.id: product for product in result.all()}
+
+    @classmethod
+    async def lock_products_by_name(
+            cls,
+            session: AsyncSession,
+            names: Iterable[str]
+    ) -> Dict[str, models.Product]:
+        """
+        Prefetches the delivered products with one SELECT ... FOR UPDATE
+        instead of a lookup per delivery line.
+        """
+        result = await session.scalars(
+            select(models.Product)
+            .filter(models.Product.name.in_(list(names)))
+            .order_by(models.Product.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        return {product.name: product for product in result.all()}
+
+    @classmethod
+    def check_stock(
+            cls,
+            stock: Dict[int, models.Product],
+            quantities: Dict[int, float]
+    ) -> None:
+        errors = []
+        for product_id, quantity in quantities.items():
+            product = stock.get(product_id)
+            if not product:
+                errors.append(
+                    f"Запись с идентификатором {product_id} нет в базе!"
+                )
+            elif product.sale_quantity == 0:
+                errors.append(
+                    f"Товар с названием {product.name} нет в наличии"
+                )
+            elif product.sale_quantity < quantity:
+                errors.append(
+                    f"Товар с названием {product.name} доступно "
+                    f"в таком количестве {product.sale_quantity} а "
+                    f"не {quantity}"
+                )
+
+        if errors:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=errors
+            )
@@ -0,0 +1,15 @@
+from functools import lru_cache
+
+from app.settings import settings
+
+
+@lru_cache()
+def get_redis():
+    """
+    Client of settings.redis_url, its connection pool is shared by all
+    storages of the process. Created on first use, so the redis package
+    is needed only when the url is set.
+    """
+    from redis import asyncio as redis
+
+    return redis.from_url(settings.redis_url)
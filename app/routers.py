@@ -6,7 +6,9 @@ from app.company import company_router
 from app.auth import auth_router
 from app.finances import finances_router
 from app.invoice import invoice_router
+from app.monitoring import monitoring_router
 from app.products import products_router
+from app.settings import settings
 from app.worker import worker_router
 
 router = APIRouter()
@@ -19,3 +21,5 @@ router.include_router(budget_router.router)
 router.include_router(finances_router.router)
 router.include_router(products_router.router)
 router.include_router(invoice_router.router)
+if settings.monitoring_enabled:
+    router.include_router(monitoring_router.router)
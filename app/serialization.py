@@ -0,0 +1,195 @@
+import enum
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple, Type, get_type_hints
+
+from fastapi import HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, create_model
+from pydantic.json import decimal_encoder
+from pydantic.utils import lenient_issubclass
+from sqlalchemy import Row
+
+from app.database.models import Base
+
+try:
+    import orjson
+except ImportError:
+    # Rows are encoded with the stdlib json then
+    orjson = None
+
+# orjson writes such floats as 1e16, the stdlib json as 1e+16
+EXPONENT_FLOAT = 1e16
+
+# Names of the serializer fields requested with ?fields=, None for all
+Fields = Optional[Tuple[str, ...]]
+
+
+class _ExponentFloat(Exception):
+    pass
+
+
+def _orjson_decimal(value: Decimal):
+    number = decimal_encoder(value)
+    if isinstance(number, float) and not -EXPONENT_FLOAT < number < EXPONENT_FLOAT:
+        raise _ExponentFloat
+    return number
+
+
+def _isoformat(value: datetime) -> str:
+    return value.isoformat()
+
+
+def _enum_value(value: enum.Enum):
+    return value.value
+
+
+@lru_cache()
+def _fields(serializer: Type[BaseModel], native: bool, names: Fields = None) -> tuple:
+    # Output key and converter of every field, as jsonable_encoder does
+    fields = []
+    for field in serializer.__fields__.values():
+        if names is not None and field.name not in names:
+            continue
+        convert = None
+        if lenient_issubclass(field.type_, Decimal):
+            convert = _orjson_decimal if native else decimal_encoder
+        elif lenient_issubclass(field.type_, datetime):
+            convert = None if native else _isoformat
+        elif lenient_issubclass(field.type_, enum.Enum):
+            convert = None if native else _enum_value
+        fields.append((field.alias, convert))
+    return tuple(fields)
+
+
+def _serialize_rows(
+        rows: Sequence[Row],
+        serializer: Type[BaseModel],
+        native: bool,
+        fields: Fields = None
+) -> List[dict]:
+    fields = _fields(serializer, native, fields)
+    items = []
+    for row in rows:
+        item = {}
+        for (key, convert), value in zip(fields, row):
+            item[key] = value if convert is None or value is None else convert(value)
+        items.append(item)
+    return items
+
+
+def serialize_rows(rows: Sequence[Row], serializer: Type[BaseModel]) -> List[dict]:
+    # JSON compatible dicts, the same as jsonable_encoder gives for models
+    return _serialize_rows(rows, serializer, native=False)
+
+
+def serializer_columns(
+        model: Base,
+        serializer: Type[BaseModel],
+        fields: Fields = None
+) -> list:
+    """
+    Columns of the serializer fields, in their order. Read-only queries
+    select them instead of the model: rows are plain tuples, not mapped
+    instances with identity map and change tracking state.
+    """
+    return [
+        getattr(model, name) for name in serializer.__fields__
+        if fields is None or name in fields
+    ]
+
+
+def fieldset(serializer: Type[BaseModel], by_alias: bool = True):
+    """
+    Dependency of the fields= query parameter, a comma separated list
+    of the response keys. Gives their field names in the serializer
+    order, so a sparse response keeps the order of the full one.
+    """
+    names = {
+        field.alias if by_alias else field.name: field.name
+        for field in serializer.__fields__.values()
+    }
+
+    def dependency(
+            fields: Optional[str] = Query(
+                None, description=f'Поля ответа через запятую: {", ".join(names)}'
+            )
+    ) -> Fields:
+        if not fields:
+            return None
+
+        requested = {key.strip() for key in fields.split(',') if key.strip()}
+        unknown = sorted(requested - names.keys())
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Неизвестные поля {unknown}, доступны {list(names)}"
+            )
+        return tuple(name for key, name in names.items() if key in requested)
+
+    return dependency
+
+
+@lru_cache()
+def partial_serializer(serializer: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    # Reads only the requested attributes, so unloaded ones aren't touched
+    hints = get_type_hints(serializer)
+    return create_model(
+        serializer.__name__,
+        __config__=serializer.__config__,
+        **{
+            name: (hints[name], serializer.__fields__[name].field_info)
+            for name in fields
+        }
+    )
+
+
+def trim_items(items: List[dict], serializer: Type[BaseModel], fields: Fields) -> List[dict]:
+    # Serialized items with only the requested fields
+    if fields is None:
+        return items
+    keys = [serializer.__fields__[name].alias for name in fields]
+    return [{key: item[key] for key in keys} for item in items]
+
+
+def model_page_response(
+        page: dict,
+        serializer: Type[BaseModel],
+        fields: Tuple[str, ...],
+        by_alias: bool = True
+) -> Response:
+    # A page of models with only the requested fields
+    partial = partial_serializer(serializer, fields)
+    items = [partial.from_orm(item) for item in page['items']]
+    return JSONResponse(content=jsonable_encoder(
+        {'items': items, 'next_cursor': page['next_cursor']},
+        by_alias=by_alias
+    ))
+
+
+def rows_page_response(
+        page: dict,
+        serializer: Type[BaseModel],
+        fields: Fields = None
+) -> Response:
+    """
+    Opt-in fast path for a page of a large list: its items are rows
+    of serializer_columns, turned into dicts and encoded at once
+    instead of validating every row with the serializer. The bytes
+    are the same as of the response_model of that serializer.
+    """
+    if orjson is not None:
+        try:
+            items = _serialize_rows(page['items'], serializer, native=True, fields=fields)
+        except _ExponentFloat:
+            pass
+        else:
+            return Response(
+                content=orjson.dumps({'items': items, 'next_cursor': page['next_cursor']}),
+                media_type='application/json'
+            )
+
+    items = _serialize_rows(page['items'], serializer, native=False, fields=fields)
+    return JSONResponse(content={'items': items, 'next_cursor': page['next_cursor']})
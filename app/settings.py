@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseSettings
 
 
@@ -12,9 +14,44 @@ class Settings(BaseSettings):
     postgres_password: str
     postgres_db: str
 
+    db_pool_size: int = 5
+    db_pool_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_pool_use_lifo: bool = False
+
     jwt_secret: str
     jwt_algorithm: str = "HS256"
     jwt_expire_minutes: int = 30
+    jwt_refresh_expire_days: int = 30
+    # Put role, company and worker into the token so requests don't load
+    # the user. Changes of them are seen only by newly issued tokens.
+    jwt_user_claims: bool = False
+    jwt_cache_size: int = 10000
+
+    # Shared storage for several app processes, memory of each one if unset
+    redis_url: Optional[str] = None
+
+    # Stored hashes with other rounds are rehashed on the next sign in
+    password_bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_queue_size: int = 64
+
+    # Sign in attempts allowed during the window, in seconds
+    login_attempts_window: int = 60
+    login_attempts_per_username: int = 10
+    login_attempts_per_ip: int = 50
+
+    # Saved responses of Idempotency-Key requests are replayed this long
+    idempotency_key_ttl_hours: int = 24
+
+    # Catalogues of products in stock kept per company, ttl in seconds
+    product_cache_size: int = 1000
+    product_cache_ttl: int = 60
+
+    # Pool and cache counters are process internals, off unless enabled
+    monitoring_enabled: bool = False
 
 
 settings = Settings(
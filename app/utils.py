@@ -1,22 +1,33 @@
 from typing import List, Union, Optional
 
 from fastapi import HTTPException, status
-from psycopg2 import errors
 from psycopg2.errorcodes import UNIQUE_VIOLATION, FOREIGN_KEY_VIOLATION, NUMERIC_VALUE_OUT_OF_RANGE
 from sqlalchemy.exc import IntegrityError, DataError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
+from app.auth.serializer import Principal
 from app.database import models
 from app.database.enums import UserRole
 from app.database.models import Base
 
+# Relations of the user which services read after the permission check.
+# AsyncSession can't lazy load them, so they are loaded together with user.
+USER_OPTIONS = [
+    joinedload(models.User.company).joinedload(models.Company.balance),
+    joinedload(models.User.company).joinedload(models.Company.budget),
+    joinedload(models.User.worker),
+    joinedload(models.User.balance),
+]
 
-def get_in_db(
-        session: Session,
+
+async def get_in_db(
+        session: AsyncSession,
         model: Base,
-        ident: int
+        ident: int,
+        options: Optional[list] = None
 ):
-    obj = session.query(model).get(ident)
+    obj = await session.get(model, ident, options=options)
     if not obj:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -25,60 +36,67 @@ def get_in_db(
     return obj
 
 
-def save_in_db(
-        session: Session,
+async def save_in_db(
+        session: AsyncSession,
         obj: Base
 ):
     session.add(obj)
-    check_unique(session)
-    session.refresh(obj)
+    await check_unique(session)
+    await session.refresh(obj)
 
 
-def update_in_db(
-        session: Session,
+async def update_in_db(
+        session: AsyncSession,
         obj: Base
 ):
-    check_unique(session)
-    session.refresh(obj)
+    await check_unique(session)
+    await session.refresh(obj)
 
 
-def delete_in_db(
-        session: Session,
+async def delete_in_db(
+        session: AsyncSession,
         obj: Base
 ):
-    session.delete(obj)
-    session.commit()
+    await session.delete(obj)
+    await session.commit()
 
 
-def check_unique(session: Session) -> None:
+async def check_unique(session: AsyncSession) -> None:
     try:
-        session.commit()
+        await session.commit()
     except (DataError, IntegrityError) as err:
-        if isinstance(err.orig, errors.lookup(UNIQUE_VIOLATION)):
-            session.rollback()
+        pgcode = getattr(err.orig, 'pgcode', None)
+        if pgcode == UNIQUE_VIOLATION:
+            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Такое имя уже занято"
             )
-        if isinstance(err.orig, errors.lookup(FOREIGN_KEY_VIOLATION)):
+        if pgcode == FOREIGN_KEY_VIOLATION:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Пользователь с таким именем удалён из базы данных",
                 headers={'WWW-Authenticate': 'Bearer'},
             )
-        if isinstance(err.orig, errors.lookup(NUMERIC_VALUE_OUT_OF_RANGE)):
+        if pgcode == NUMERIC_VALUE_OUT_OF_RANGE:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Целое число вне диапазона",
             )
 
 
-def check_user(session: Session, user_id: int) -> models.User:
-    user: models.User = get_in_db(
+async def get_user(session: AsyncSession, user_id: int) -> models.User:
+    user: models.User = await get_in_db(
         session=session,
         model=models.User,
-        ident=user_id
+        ident=user_id,
+        options=USER_OPTIONS
     )
+    return user
+
+
+async def check_user(session: AsyncSession, user_id: int) -> models.User:
+    user = await get_user(session, user_id)
     if user.company_id is None and user.worker_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -88,14 +106,49 @@ def check_user(session: Session, user_id: int) -> models.User:
     return user
 
 
-def check_user_permission(
-        session: Session,
+def check_principal(principal: Principal) -> Principal:
+    if principal.company_id is None and principal.worker_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Пользователь не состоит в компании!"
+        )
+
+    return principal
+
+
+def check_principal_permission(
+        principal: Principal,
+        permissions: Union[List[UserRole], str]
+) -> Principal:
+    """Permission check on the request principal, doesn't touch database."""
+    check_principal(principal)
+
+    if '__all__' in permissions:
+        return principal
+
+    if principal.role not in permissions:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="У вас нет прав на это действие!"
+        )
+
+    return principal
+
+
+async def check_user_permission(
+        session: AsyncSession,
         permissions: Union[List[UserRole], str],
         user_id: Optional[int] = None,
-        user: Optional[models.User] = None
+        user: Optional[models.User] = None,
+        principal: Optional[Principal] = None
 ):
+    if not user and principal:
+        check_principal_permission(principal, permissions)
+        # Usually already in the identity map after get_current_user
+        return await get_user(session, principal.id)
+
     if not user and user_id:
-        user = check_user(session, user_id)
+        user = await check_user(session, user_id)
 
     if '__all__' in permissions:
         return user
@@ -109,15 +162,11 @@ def check_user_permission(
     return user
 
 
-def check_user_company(
-        session: Session,
+async def check_user_company(
+        session: AsyncSession,
         user_id: int
 ) -> models.User:
-    user: models.User = get_in_db(
-        session=session,
-        model=models.User,
-        ident=user_id
-    )
+    user = await get_user(session, user_id)
     if user.company_id or user.worker_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
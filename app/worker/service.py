@@ -1,9 +1,12 @@
-from typing import List, Union
+from typing import List, Union, Optional
 
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app import utils
+from app.auth.serializer import Principal
 from app.database import models
 from app.database.database import get_session
 from app.database.enums import UserRole
@@ -12,36 +15,36 @@ from app.worker.serializer import CreateWorker, UpdateWorker
 
 class WorkerService:
 
-    def __init__(self, session: Session = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
         self.session = session
 
-    def get_worker(
+    async def get_worker(
             self,
-            user_id: int,
+            principal: Principal,
             worker_id: int = None
     ) -> models.Worker:
-        user = self._get_user(
-            user_id=user_id,
+        user = await self._get_user(
+            principal=principal,
             permissions=[
                 UserRole.WORKER_DIRECTOR, UserRole.WORKER_ADMIN,
                 UserRole.ADMIN, UserRole.DIRECTOR
             ]
         )
 
-        return self._get_worker(user, worker_id)
+        return await self._get_worker(user, worker_id)
 
-    def create_worker(
+    async def create_worker(
             self,
-            main_user_id: int,
+            principal: Principal,
             worker_user_id: int,
             data: CreateWorker
     ) -> models.Worker:
-        main_user = self._get_user(
-            user_id=main_user_id,
+        main_user = await self._get_user(
+            principal=principal,
             permissions=[UserRole.DIRECTOR]
         )
 
-        worker_user = utils.check_user_company(
+        worker_user = await utils.check_user_company(
             session=self.session,
             user_id=worker_user_id
         )
@@ -50,115 +53,129 @@ class WorkerService:
             **data.dict(exclude={'worker_user_id'}),
             company_id=main_user.company_id
         )
-        utils.save_in_db(self.session, worker)
+        await utils.save_in_db(self.session, worker)
 
         worker_user.worker_id = worker.id
         worker_user.company_id = worker.company_id
         worker_user.role = UserRole.WORKER_DIRECTOR
-        utils.update_in_db(self.session, worker_user)
+        await utils.update_in_db(self.session, worker_user)
 
-        return worker
+        return await self._load_worker(worker.id)
 
-    def update_worker(
+    async def update_worker(
             self,
-            user_id: int,
+            principal: Principal,
             worker_id: int,
             data: UpdateWorker
     ) -> models.Worker:
-        user = self._get_user(
-            user_id=user_id,
+        user = await self._get_user(
+            principal=principal,
             permissions=[
                 UserRole.DIRECTOR, UserRole.WORKER_DIRECTOR,
             ]
         )
 
-        worker = self._get_worker(user, worker_id)
+        worker = await self._get_worker(user, worker_id)
 
         for field, value in data:
             setattr(worker, field, value)
 
-        utils.update_in_db(self.session, worker)
+        await utils.update_in_db(self.session, worker)
 
-        return worker
+        return await self._load_worker(worker.id)
 
-    def delete_worker(
+    async def delete_worker(
             self,
-            user_id: int,
+            principal: Principal,
             worker_id: int
     ):
-        user = self._get_user(user_id, [UserRole.DIRECTOR])
-        worker = self._get_worker(user, worker_id)
+        user = await self._get_user(principal, [UserRole.DIRECTOR])
+        worker = await self._get_worker(user, worker_id)
         for user in worker.users:
             user.role = UserRole.CUSTOMER
             user.company_id = None
 
-        utils.delete_in_db(self.session, worker)
+        await utils.delete_in_db(self.session, worker)
 
-    def add_user(
+    async def add_user(
             self,
             new_user_id: int,
-            user_id: int,
+            principal: Principal,
     ):
-        user = self._get_user(
-            user_id=user_id,
+        user = await self._get_user(
+            principal=principal,
             permissions=[UserRole.WORKER_DIRECTOR, UserRole.WORKER_ADMIN]
         )
 
-        new_user = utils.check_user_company(self.session, new_user_id)
+        new_user = await utils.check_user_company(self.session, new_user_id)
 
         new_user.worker_id = user.worker_id
         new_user.company_id = user.company_id
         new_user.role = UserRole.WORKER_ADMIN
-        utils.update_in_db(self.session, new_user)
+        await utils.update_in_db(self.session, new_user)
 
-    def delete_user(
+    async def delete_user(
             self,
             old_user_id: int,
-            user_id: int,
+            principal: Principal,
     ):
-        user = self._get_user(
-            user_id=user_id,
+        user = await self._get_user(
+            principal=principal,
             permissions=[UserRole.WORKER_DIRECTOR, UserRole.WORKER_ADMIN]
         )
 
-        old_user = self._get_user(old_user_id, '__all__')
+        old_user = await utils.check_user_permission(
+            session=self.session,
+            user_id=old_user_id,
+            permissions='__all__'
+        )
 
         utils.check_delete_status(
-            admin_user_id=user_id,
-            company=user.worker,
+            admin_user_id=principal.id,
+            company=await self._load_worker(user.worker_id),
             old_user=old_user
         )
 
         old_user.worker_id = None
         old_user.company_id = None
         old_user.role = UserRole.CUSTOMER
-        utils.update_in_db(self.session, old_user)
+        await utils.update_in_db(self.session, old_user)
 
-    def _get_user(
+    async def _get_user(
             self,
-            user_id: int,
+            principal: Principal,
             permissions: Union[List[UserRole], str]
     ) -> models.User:
-        user = utils.check_user_permission(
+        user = await utils.check_user_permission(
             session=self.session,
-            user_id=user_id,
+            principal=principal,
             permissions=permissions
         )
         return user
 
-    def _get_worker(
+    async def _load_worker(self, worker_id: int) -> Optional[models.Worker]:
+        # Worker is serialized with its users,
+        # load them eagerly because async session can't do it lazily.
+        return await self.session.scalar(
+            select(models.Worker)
+            .filter_by(id=worker_id)
+            .options(selectinload(models.Worker.users))
+        )
+
+    async def _get_worker(
             self,
             user: models.User,
             worker_id: int
     ) -> models.Worker:
         if user.role == UserRole.WORKER_DIRECTOR:
-            worker = user.worker
+            worker = await self._load_worker(user.worker_id)
         elif worker_id:
-            worker: models.Worker = utils.get_in_db(
-                session=self.session,
-                model=models.Worker,
-                ident=worker_id
-            )
+            worker = await self._load_worker(worker_id)
+            if not worker:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Запись с идентификатором {worker_id} нет в базе!"
+                )
         else:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
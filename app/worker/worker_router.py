@@ -2,6 +2,7 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, status, Response
 
+from app.auth.serializer import Principal
 from app.auth.service import get_current_user
 from app.worker.serializer import Worker, CreateWorker, UpdateWorker
 from app.worker.service import WorkerService
@@ -13,59 +14,59 @@ router = APIRouter(
 
 
 @router.get('/', response_model=Worker)
-def get_worker(
+async def get_worker(
         worker_id: Optional[int] = None,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: WorkerService = Depends()
 ):
-    return service.get_worker(user_id, worker_id)
+    return await service.get_worker(principal, worker_id)
 
 
 @router.post('/{worker_user_id}', response_model=Worker)
-def create_worker(
+async def create_worker(
         worker_user_id: int,
         data: CreateWorker,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: WorkerService = Depends()
 ):
-    return service.create_worker(
-        main_user_id=user_id,
+    return await service.create_worker(
+        principal=principal,
         worker_user_id=worker_user_id,
         data=data
     )
 
 
 @router.put('/', response_model=Worker)
-def update_worker(
+async def update_worker(
         data: UpdateWorker,
         worker_id: Optional[int] = None,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: WorkerService = Depends()
 ):
-    return service.update_worker(
-        user_id=user_id,
+    return await service.update_worker(
+        principal=principal,
         worker_id=worker_id,
         data=data
     )
 
 
 @router.delete('/', status_code=status.HTTP_204_NO_CONTENT)
-def delete_worker(
+async def delete_worker(
         worker_id: Optional[int] = None,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: WorkerService = Depends()
 ):
-    service.delete_worker(user_id, worker_id)
+    await service.delete_worker(principal, worker_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.post('/add_user/{new_user_id}', status_code=status.HTTP_200_OK)
-def add_user(
+async def add_user(
         new_user_id: int,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: WorkerService = Depends()
 ):
-    service.add_user(new_user_id, user_id)
+    await service.add_user(new_user_id, principal)
     return {"message": "Пользователь успешно добавлен!"}
 
 
@@ -73,10 +74,10 @@ def add_user(
     '/delete_user/{old_user_id}',
     status_code=status.HTTP_204_NO_CONTENT
 )
-def delete_user(
+async def delete_user(
         old_user_id: int,
-        user_id: int = Depends(get_current_user),
+        principal: Principal = Depends(get_current_user),
         service: WorkerService = Depends()
 ):
-    service.delete_user(old_user_id, user_id)
+    await service.delete_user(old_user_id, principal)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,49 @@
+"""
+AuthService.verify_token of one access token, decoded by jose on every
+call against verified payloads taken from the token cache. The denylist
+of the settings is checked on both paths.
+
+    python -m benchmarks.auth --calls 50000
+"""
+import argparse
+import asyncio
+import time
+
+from app.auth.service import AuthService
+from app.auth.token_cache import token_cache
+from app.database import models
+from app.database.enums import UserRole
+
+PATHS = ('decode every time', 'cached')
+
+
+async def measure(token: str, path: str, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        if path == 'decode every time':
+            token_cache.entries.clear()
+        await AuthService.verify_token(token)
+    return (time.perf_counter() - started) / calls
+
+
+async def main(calls: int, repeat: int) -> None:
+    user = models.User(
+        id=1,
+        username='benchmark',
+        email='benchmark@example.com',
+        role=UserRole.DIRECTOR,
+        company_id=1
+    )
+    token = AuthService.create_token(user, session_id=1).access_token
+
+    for path in PATHS:
+        best = min([await measure(token, path, calls) for _ in range(repeat)])
+        print(f"{path:<18} {best * 10 ** 6:6.1f} us/request")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.repeat))
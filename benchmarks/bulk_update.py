@@ -0,0 +1,89 @@
+"""
+PUT /products/ of the service, one UPDATE ... FROM (VALUES ...) for
+the whole list, against the previous path with a get, a commit and a
+refresh per product.
+
+    python -m benchmarks.bulk_update --products 500 5000
+"""
+import argparse
+import asyncio
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app import utils
+from app.database import models
+from app.products.serializer import UpdateProducts
+from app.products.service import ProductService
+from benchmarks.seed import create_company, scratch_connection, scratch_session
+
+PATHS = ('per product', 'one statement')
+
+
+async def seed_products(connection: AsyncConnection, company: SimpleNamespace, count: int) -> list:
+    return (await connection.execute(
+        text(
+            "INSERT INTO products "
+            "(name, purchase_price, sale_price, quantity, unit_of_measure, sale_quantity, date, company_id) "
+            "SELECT :prefix || g, 10, 15, 100, 'PIECES', 0, now(), :company_id "
+            "FROM generate_series(1, :count) g RETURNING id"
+        ),
+        {'prefix': f'benchmark-{company.id}-', 'company_id': company.id, 'count': count}
+    )).scalars().all()
+
+
+async def update_per_product(service: ProductService, data: list) -> list:
+    # The loop PUT /products/ ran before the single statement
+    products = []
+    for item in data:
+        product = await utils.get_in_db(session=service.session, model=models.Product, ident=item.product_id)
+        await service._update_product(item, product)
+        products.append(product)
+    return products
+
+
+async def measure(connection: AsyncConnection, path: str, company: SimpleNamespace, data: list) -> float:
+    async with scratch_session(connection) as session:
+        service = ProductService(session)
+        started = time.perf_counter()
+        if path == 'per product':
+            products = await update_per_product(service, data)
+        else:
+            products = await service.update_products(company.director, data)
+        elapsed = time.perf_counter() - started
+
+    assert [product.sale_price for product in products] == [item.sale_price for item in data]
+    return elapsed
+
+
+async def main(sizes: list, repeat: int) -> None:
+    async with scratch_connection() as connection:
+        company = await create_company(connection)
+        product_ids = await seed_products(connection, company, max(sizes))
+
+        for count in sizes:
+            for path in PATHS:
+                # New prices every run, so each of them really changes the rows
+                best = min([
+                    await measure(connection, path, company, [
+                        UpdateProducts(
+                            product_id=ident,
+                            sale_price=Decimal(run * 100 + n % 100),
+                            sale_quantity=n % 7
+                        )
+                        for n, ident in enumerate(product_ids[:count])
+                    ])
+                    for run in range(repeat)
+                ])
+                print(f"{count:>6} products  {path:<14} {best * 1000:8.0f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, nargs='+', default=[500, 5000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.products, args.repeat))
@@ -0,0 +1,158 @@
+"""
+Plans of the hot queries on a seeded dataset, EXPLAIN ANALYZE with
+the indexes of the models and without them. The indexes are dropped
+inside the rolled back transaction, which locks the tables until the
+end, so run it against a scratch database.
+
+    python -m benchmarks.query_plans --companies 200 --rows 1000000
+"""
+import argparse
+import asyncio
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from benchmarks.seed import scratch_connection
+
+TABLES = ['balance_history', 'budget_history', 'finances', 'invoices', 'invoices_products', 'products']
+
+PERIOD = "date >= now() - interval '7 days' AND date < now()"
+
+QUERIES = {
+    'balance_history': f"SELECT * FROM balance_history WHERE balance_id = :balance_id AND {PERIOD}",
+    'budget_history': f"SELECT * FROM budget_history WHERE budget_id = :budget_id AND {PERIOD}",
+    'finances': f"SELECT * FROM finances WHERE company_id = :company_id AND {PERIOD}",
+    'invoices': "SELECT * FROM invoices WHERE user_id = :company_id OR company_id = :company_id",
+    'products in stock': "SELECT * FROM products WHERE company_id = :company_id AND quantity > 0",
+    'invoices_products': "SELECT * FROM invoices_products WHERE invoice_id = ANY(:invoice_ids)",
+}
+
+# Random moment of the last two years, owner picked round robin from :ids
+RANDOM_DATE = "now() - random() * interval '730 days'"
+OWNER = "(CAST(:ids AS integer[]))[1 + g % cardinality(CAST(:ids AS integer[]))]"
+
+
+async def insert_ids(connection: AsyncConnection, statement: str, **params) -> list:
+    return (await connection.execute(text(statement + ' RETURNING id'), params)).scalars().all()
+
+
+async def seed(connection: AsyncConnection, companies: int, rows: int) -> dict:
+    """
+    Companies with balance and budget, `rows` rows of balance history,
+    budget history, finances and invoices_products, half as many invoices
+    and a tenth as many products. Returns the ids of the first company.
+    """
+    prefix = f'benchmark-{uuid.uuid4().hex[:12]}-'
+    company_ids = await insert_ids(
+        connection,
+        "INSERT INTO company (name) SELECT :prefix || g FROM generate_series(1, :companies) g",
+        prefix=prefix, companies=companies
+    )
+    balance_ids = await insert_ids(
+        connection,
+        "INSERT INTO balance (balance, date, company_id) SELECT 0, now(), id FROM unnest(CAST(:ids AS integer[])) id",
+        ids=company_ids
+    )
+    budget_ids = await insert_ids(
+        connection,
+        "INSERT INTO budget (income, expense, profit, date, company_id) "
+        "SELECT 0, 0, 0, now(), id FROM unnest(CAST(:ids AS integer[])) id",
+        ids=company_ids
+    )
+
+    await connection.execute(text(
+        "INSERT INTO balance_history (prev_balance, date, created_at, transaction_type, amount, balance_id) "
+        f"SELECT 0, {RANDOM_DATE}, now(), 'INCOME', 1, {OWNER} FROM generate_series(1, :rows) g"
+    ), {'ids': balance_ids, 'rows': rows})
+    await connection.execute(text(
+        "INSERT INTO budget_history (income, expense, profit, date, transaction_type, amount, budget_id) "
+        f"SELECT 0, 0, 0, {RANDOM_DATE}, 'INCOME', 1, {OWNER} FROM generate_series(1, :rows) g"
+    ), {'ids': budget_ids, 'rows': rows})
+    await connection.execute(text(
+        "INSERT INTO finances (amount, date, transaction_type, company_id) "
+        f"SELECT 1, {RANDOM_DATE}, 'EXPENSE', {OWNER} FROM generate_series(1, :rows) g"
+    ), {'ids': company_ids, 'rows': rows})
+
+    invoice_ids = await insert_ids(
+        connection,
+        f"INSERT INTO invoices (to_pay, date, company_id) "
+        f"SELECT 1, {RANDOM_DATE}, {OWNER} FROM generate_series(1, :rows) g",
+        ids=company_ids, rows=rows // 2
+    )
+    # A third of the products are out of stock
+    product_ids = await insert_ids(
+        connection,
+        "INSERT INTO products "
+        "(name, purchase_price, sale_price, quantity, unit_of_measure, sale_quantity, date, company_id) "
+        f"SELECT :prefix || g, 1, 2, (g % 3) * 10, 'PIECES', 0, now(), {OWNER} "
+        "FROM generate_series(1, :rows) g",
+        prefix=prefix, ids=company_ids, rows=rows // 10
+    )
+    await connection.execute(text(
+        "INSERT INTO invoices_products (invoice_id, product_id) "
+        "SELECT invoice_ids[1 + g % cardinality(invoice_ids)], product_ids[1 + g * 7 % cardinality(product_ids)] "
+        "FROM generate_series(1, :rows) g, "
+        "(SELECT CAST(:invoice_ids AS integer[]) AS invoice_ids, CAST(:product_ids AS integer[]) AS product_ids) ids"
+    ), {'invoice_ids': invoice_ids, 'product_ids': product_ids, 'rows': rows})
+
+    # Owners are picked by g % n, so the first company owns every n-th invoice
+    return {
+        'company_id': company_ids[0],
+        'balance_id': balance_ids[0],
+        'budget_id': budget_ids[0],
+        'invoice_ids': invoice_ids[companies - 1::companies][:10],
+    }
+
+
+async def explain(connection: AsyncConnection, params: dict, verbose: bool) -> dict:
+    plans = {}
+    for name, query in QUERIES.items():
+        lines = (await connection.execute(
+            text(f"EXPLAIN (ANALYZE, COSTS OFF, SUMMARY ON) {query}"), params
+        )).scalars().all()
+        if verbose:
+            print(f'{name}:', *lines, sep='\n    ')
+        # The scan under Gather of a parallel plan tells more than Gather
+        scan = next((line for line in lines if 'Scan' in line), lines[0])
+        total = next(line for line in lines if line.startswith('Execution Time'))
+        plans[name] = (scan.strip(' ->'), float(total.split()[2]))
+    return plans
+
+
+async def drop_indexes(connection: AsyncConnection) -> list:
+    # All but the indexes of primary keys and unique constraints
+    names = (await connection.execute(text(
+        "SELECT indexname FROM pg_indexes i "
+        "WHERE schemaname = current_schema() AND tablename = ANY(:tables) "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname) "
+        "ORDER BY indexname"
+    ), {'tables': TABLES})).scalars().all()
+    for name in names:
+        await connection.execute(text(f'DROP INDEX "{name}"'))
+    return names
+
+
+async def main(companies: int, rows: int, verbose: bool) -> None:
+    async with scratch_connection() as connection:
+        params = await seed(connection, companies, rows)
+        for table in TABLES:
+            await connection.execute(text(f'ANALYZE {table}'))
+
+        indexed = await explain(connection, params, verbose)
+        dropped = await drop_indexes(connection)
+        plain = await explain(connection, params, verbose)
+
+        print(f"Without: {', '.join(dropped)}")
+        for name in QUERIES:
+            for label, (plan, ms) in (('without', plain[name]), ('with', indexed[name])):
+                print(f"{name:<18} {label:<8} {ms:9.2f} ms  {plan}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--companies', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--verbose', action='store_true', help='print the whole plans')
+    args = parser.parse_args()
+    asyncio.run(main(args.companies, args.rows, args.verbose))
@@ -0,0 +1,79 @@
+"""
+Memory of a balance history loaded as mapped entities and as the
+column rows the read-only endpoints select, measured with tracemalloc.
+
+    python -m benchmarks.read_models_memory --rows 100000
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.balance.serializer import BalanceHistory
+from app.database import models
+from app.serialization import serializer_columns
+from benchmarks.seed import create_company, scratch_connection, scratch_session, seed_history
+
+
+def history_query(kind: str, balance_id: int):
+    if kind == 'entities':
+        query = select(models.BalanceHistory)
+    else:
+        query = select(*serializer_columns(models.BalanceHistory, BalanceHistory))
+    return query.filter(models.BalanceHistory.balance_id == balance_id)
+
+
+async def load(connection: AsyncConnection, kind: str, balance_id: int, trace: bool) -> dict:
+    # A new session, so entities of a previous load aren't in identity map
+    async with scratch_session(connection) as session:
+        gc.collect()
+        if trace:
+            tracemalloc.start()
+        started = time.perf_counter()
+
+        query = history_query(kind, balance_id)
+        if kind == 'entities':
+            rows = (await session.scalars(query)).all()
+        else:
+            rows = (await session.execute(query)).all()
+
+        elapsed = time.perf_counter() - started
+        result = {'rows': len(rows), 'ms': elapsed * 1000}
+        if trace:
+            retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result.update(retained=retained, peak=peak)
+        return result
+
+
+async def main(rows: int, repeat: int) -> None:
+    async with scratch_connection() as connection:
+        company = await create_company(connection)
+        await seed_history(connection, company, rows)
+
+        for kind in ('entities', 'rows'):
+            # Timed without tracemalloc, it slows allocations down
+            best = min([
+                (await load(connection, kind, company.balance_id, trace=False))['ms']
+                for _ in range(repeat)
+            ])
+            traced = await load(connection, kind, company.balance_id, trace=True)
+            print(
+                f"{kind:<9} rows {traced['rows']}  "
+                f"retained {traced['retained'] / 2 ** 20:6.1f} MiB "
+                f"({traced['retained'] / traced['rows']:5.0f} B/row)  "
+                f"peak {traced['peak'] / 2 ** 20:6.1f} MiB  "
+                f"load {best:6.0f} ms"
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
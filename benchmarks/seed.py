@@ -0,0 +1,102 @@
+"""
+Data of the benchmarks. They work with the database of the settings
+inside one transaction which is rolled back at the end, so a run
+leaves nothing behind and its data isn't seen by others.
+"""
+import uuid
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.auth.serializer import Principal
+from app.database import models
+from app.database.database import Session, engine
+from app.database.enums import UserRole
+
+
+@asynccontextmanager
+async def scratch_connection():
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            yield connection
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+
+def scratch_session(connection: AsyncConnection) -> AsyncSession:
+    # Transactions of the session are savepoints of the scratch one
+    return Session(bind=connection, join_transaction_mode='create_savepoint')
+
+
+async def create_company(connection: AsyncConnection) -> SimpleNamespace:
+    # Company with balance and budget, and its director
+    suffix = uuid.uuid4().hex[:12]
+    async with scratch_session(connection) as session, session.begin():
+        company = models.Company(
+            name=f'benchmark-{suffix}',
+            balance=models.Balance(balance=Decimal(0)),
+            budget=models.Budget(
+                income=Decimal(0),
+                expense=Decimal(0),
+                profit=Decimal(0)
+            )
+        )
+        director = models.User(
+            username=f'benchmark-{suffix}',
+            email=f'benchmark-{suffix}@example.com',
+            password='-',
+            role=UserRole.DIRECTOR,
+            company=company
+        )
+        session.add_all([company, director])
+
+    return SimpleNamespace(
+        id=company.id,
+        balance_id=company.balance.id,
+        budget_id=company.budget.id,
+        director=Principal.from_orm(director)
+    )
+
+
+async def seed_history(connection: AsyncConnection, company: SimpleNamespace, rows: int) -> None:
+    """
+    Rows of balance history, budget history and finances of the company,
+    with dates a few seconds apart, microseconds and both transaction types.
+    """
+    await connection.execute(
+        text(
+            "INSERT INTO balance_history "
+            "(prev_balance, date, created_at, transaction_type, amount, balance_id) "
+            "SELECT g * 7.123 - 500, "
+            "now() - g * interval '37 second' + (g % 7) * interval '1 microsecond', "
+            "now(), "
+            "CASE WHEN g % 2 = 0 THEN 'INCOME'::transactiontype "
+            "ELSE 'EXPENSE'::transactiontype END, "
+            "g % 1000 + 0.5, :balance_id "
+            "FROM generate_series(1, :rows) g"
+        ),
+        {'balance_id': company.balance_id, 'rows': rows}
+    )
+    await connection.execute(
+        text(
+            "INSERT INTO budget_history "
+            "(income, expense, profit, date, transaction_type, amount, budget_id) "
+            "SELECT g * 1.1, g * 0.3, g * 0.8, now() - g * interval '41 second', "
+            "'INCOME', g, :budget_id "
+            "FROM generate_series(1, :rows) g"
+        ),
+        {'budget_id': company.budget_id, 'rows': rows}
+    )
+    await connection.execute(
+        text(
+            "INSERT INTO finances (amount, date, transaction_type, company_id) "
+            "SELECT g * 3.333, now() - g * interval '43 second', 'EXPENSE', :company_id "
+            "FROM generate_series(1, :rows) g"
+        ),
+        {'company_id': company.id, 'rows': rows}
+    )
@@ -0,0 +1,101 @@
+"""
+A page of balance history encoded the way response_model does it,
+validating entities with pydantic, against the rows fast path with
+orjson and with the stdlib json fallback. Bodies must be the same.
+
+    python -m benchmarks.serialization --rows 10000 100000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app import serialization
+from app.balance.serializer import BalanceHistory
+from app.database import models
+from app.pagination import Page
+from app.serialization import rows_page_response, serializer_columns
+from benchmarks.seed import create_company, scratch_connection, scratch_session, seed_history
+
+PATHS = ('pydantic', 'rows+orjson', 'rows+json')
+
+
+async def fetch(connection: AsyncConnection, path: str, balance_id: int, rows: int) -> list:
+    if path == 'pydantic':
+        query = select(models.BalanceHistory)
+    else:
+        query = select(*serializer_columns(models.BalanceHistory, BalanceHistory))
+    query = (
+        query
+        .filter(models.BalanceHistory.balance_id == balance_id)
+        .order_by(models.BalanceHistory.date, models.BalanceHistory.id)
+        .limit(rows)
+    )
+    async with scratch_session(connection) as session:
+        if path == 'pydantic':
+            return (await session.scalars(query)).all()
+        return (await session.execute(query)).all()
+
+
+async def encode(path: str, items: list) -> bytes:
+    page = {'items': items, 'next_cursor': None}
+    if path == 'pydantic':
+        field = create_response_field(name='response', type_=Page[BalanceHistory])
+        content = await serialize_response(field=field, response_content=page)
+        return JSONResponse(content=content).body
+
+    orjson = serialization.orjson
+    if path == 'rows+json':
+        serialization.orjson = None
+    try:
+        return rows_page_response(page, BalanceHistory).body
+    finally:
+        serialization.orjson = orjson
+
+
+async def measure(connection: AsyncConnection, path: str, balance_id: int, rows: int, repeat: int):
+    # Best of the runs, fetch and serialization separately
+    best_fetch = best_encode = float('inf')
+    body = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = await fetch(connection, path, balance_id, rows)
+        fetched = time.perf_counter()
+        body = await encode(path, items)
+        encoded = time.perf_counter()
+        best_fetch = min(best_fetch, fetched - started)
+        best_encode = min(best_encode, encoded - fetched)
+    return best_fetch * 1000, best_encode * 1000, body
+
+
+async def main(sizes: list, repeat: int) -> None:
+    async with scratch_connection() as connection:
+        company = await create_company(connection)
+        await seed_history(connection, company, max(sizes))
+
+        print(f"{'rows':>7}  {'path':<12} {'fetch':>9} {'serialize':>10} {'total':>9}")
+        for rows in sizes:
+            bodies = {}
+            for path in PATHS:
+                fetch_ms, encode_ms, bodies[path] = await measure(
+                    connection, path, company.balance_id, rows, repeat
+                )
+                print(
+                    f"{rows:>7}  {path:<12} {fetch_ms:6.0f} ms {encode_ms:7.0f} ms "
+                    f"{fetch_ms + encode_ms:6.0f} ms"
+                )
+            same = len(set(bodies.values())) == 1
+            print(f"{rows:>7}  bodies {'identical' if same else 'DIFFER'}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
@@ -0,0 +1,107 @@
+"""
+Tests work with the database of the settings, so POSTGRES_* variables
+or .env should point to a scratch database. Tables are created if
+missing, every test makes its own company with unique names.
+"""
+import asyncio
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from app.auth.serializer import Principal
+from app.database import models
+from app.database.database import Base, Session, engine
+from app.database.enums import UserRole
+
+
+def _run(coroutine):
+    # Pooled asyncpg connections belong to the loop which opened them
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(scope='session')
+def run():
+    return _run
+
+
+@pytest.fixture(scope='session', autouse=True)
+def tables():
+    async def create_all():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    _run(create_all())
+
+
+@pytest.fixture
+def statements():
+    """
+    Counts statements sent to the database, reset it before the
+    part of the test which is measured.
+    """
+    counter = SimpleNamespace(count=0)
+
+    def count(*args):
+        counter.count += 1
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', count)
+    yield counter
+    event.remove(engine.sync_engine, 'before_cursor_execute', count)
+
+
+@pytest.fixture
+def company(run):
+    """
+    Company with balance and budget, its director and a worker user.
+    """
+    suffix = uuid.uuid4().hex[:12]
+
+    async def create():
+        async with Session() as session, session.begin():
+            company = models.Company(
+                name=f'company-{suffix}',
+                balance=models.Balance(balance=Decimal(0)),
+                budget=models.Budget(
+                    income=Decimal(0),
+                    expense=Decimal(0),
+                    profit=Decimal(0)
+                )
+            )
+            worker = models.Worker(name=f'worker-{suffix}', company=company)
+            director = models.User(
+                username=f'director-{suffix}',
+                email=f'director-{suffix}@example.com',
+                password='-',
+                role=UserRole.DIRECTOR,
+                company=company
+            )
+            seller = models.User(
+                username=f'seller-{suffix}',
+                email=f'seller-{suffix}@example.com',
+                password='-',
+                role=UserRole.WORKER_USER,
+                company=company,
+                worker=worker
+            )
+            session.add_all([company, worker, director, seller])
+
+        return SimpleNamespace(
+            id=company.id,
+            balance_id=company.balance.id,
+            budget_id=company.budget.id,
+            worker_id=worker.id,
+            suffix=suffix,
+            director=Principal.from_orm(director),
+            seller=Principal.from_orm(seller)
+        )
+
+    return run(create())
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app.balance.service import BalanceService
+from app.database import models
+from app.database.database import Session
+from app.database.enums import BalanceType, TransactionType
+
+
+async def change(company, amount: int, transaction_type: TransactionType, date: datetime) -> datetime:
+    async with Session() as session, session.begin():
+        balance = await session.get(models.Balance, company.balance_id)
+        balance, balance_history = await BalanceService.change_balance(
+            session=session,
+            amount=Decimal(amount),
+            transaction_type=transaction_type,
+            date=date,
+            balance=balance
+        )
+        session.add(balance_history)
+    return datetime.now()
+
+
+async def balance_at(company, date: datetime) -> Decimal:
+    async with Session() as session:
+        result = await BalanceService(session).get_balance_at(
+            company.director, BalanceType.COMPANY, date
+        )
+    return result['balance']
+
+
+async def probe(company) -> list:
+    now = datetime.now()
+    before = datetime.now()
+    # Dated in the past and each one earlier than the change before it
+    after_income = await change(company, 100, TransactionType.INCOME, now - timedelta(days=1))
+    after_expense = await change(company, 30, TransactionType.EXPENSE, now - timedelta(days=2))
+    return [
+        await balance_at(company, moment)
+        for moment in (before, after_income, after_expense, datetime.now())
+    ]
+
+
+def test_balance_at_ignores_order_of_change_dates(run, company):
+    assert run(probe(company)) == [0, 100, 70, 70]
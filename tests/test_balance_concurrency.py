@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.balance.service import BalanceService
+from app.database import models
+from app.database.database import Session
+from app.database.enums import TransactionType
+
+CHANGES = 50
+
+
+async def replenish(balance_id: int) -> None:
+    async with Session() as session, session.begin():
+        balance = await session.get(models.Balance, balance_id)
+        balance, balance_history = await BalanceService.change_balance(
+            session=session,
+            amount=Decimal(1),
+            transaction_type=TransactionType.INCOME,
+            date=datetime.now(),
+            balance=balance
+        )
+        session.add(balance_history)
+
+
+async def replenish_concurrently(balance_id: int) -> tuple[Decimal, list]:
+    await asyncio.gather(*[replenish(balance_id) for _ in range(CHANGES)])
+    async with Session() as session:
+        balance = await session.scalar(
+            select(models.Balance.balance).filter_by(id=balance_id)
+        )
+        prev_balances = await session.scalars(
+            select(models.BalanceHistory.prev_balance)
+            .filter_by(balance_id=balance_id)
+        )
+        return balance, prev_balances.all()
+
+
+def test_concurrent_changes_dont_lose_each_other(run, company):
+    balance, prev_balances = run(replenish_concurrently(company.balance_id))
+
+    assert balance == CHANGES
+    # Every change saw the result of the one before it
+    assert sorted(prev_balances) == list(range(CHANGES))
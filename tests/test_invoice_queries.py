@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+import pytest
+
+from app.database import models
+from app.database.database import Session
+from app.database.enums import UnitOfMeasureType
+from app.invoice.serializer import CompanyInvoice, UserInvoice
+from app.invoice.service import InvoiceService
+from app.pagination import Pagination
+
+INVOICES = 40
+PAGE_SIZES = (5, INVOICES)
+
+
+async def create_invoices(company, count: int) -> None:
+    # Director is the buyer, so the invoices are in both listings
+    async with Session() as session, session.begin():
+        for index in range(count):
+            session.add(models.Invoice(
+                to_pay=Decimal(2),
+                company_id=company.id,
+                user_id=company.director.id,
+                worker_id=company.worker_id,
+                products=[
+                    models.Product(
+                        name=f'product-{company.suffix}-{index}-{line}',
+                        purchase_price=Decimal(1),
+                        sale_price=Decimal(1),
+                        quantity=1,
+                        sale_quantity=1,
+                        unit_of_measure=UnitOfMeasureType.PIECES,
+                        company_id=company.id
+                    )
+                    for line in range(2)
+                ]
+            ))
+
+
+async def list_invoices(listing: str, company, limit: int) -> list:
+    async with Session() as session:
+        service = InvoiceService(session)
+        if listing == 'user':
+            page = await service.get_user_invoices(
+                company.director, Pagination(limit=limit)
+            )
+            serializer = UserInvoice
+        else:
+            page = await service.get_company_invoices(
+                company.director, Pagination(limit=limit)
+            )
+            serializer = CompanyInvoice
+        # Relations the serializer reads must be loaded already
+        return [serializer.from_orm(invoice) for invoice in page['items']]
+
+
+@pytest.mark.parametrize('listing', ['user', 'company'])
+def test_invoice_listing_statements_dont_grow(run, company, statements, listing):
+    run(create_invoices(company, INVOICES))
+
+    counts = []
+    for limit in PAGE_SIZES:
+        statements.count = 0
+        items = run(list_invoices(listing, company, limit))
+
+        assert len(items) == limit
+        assert all(len(item.products) == 2 for item in items)
+        counts.append(statements.count)
+
+    assert counts[0] == counts[1], f'statements per page of {PAGE_SIZES}: {counts}'
@@ -0,0 +1,34 @@
+import base64
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.pagination import decode_cursor, encode_cursor
+
+
+def forge(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def test_cursor_round_trip():
+    date = datetime(2020, 1, 1, 12, 30, 0, 123456)
+    assert decode_cursor(encode_cursor(date, 2 ** 31 - 1)) == (date, 2 ** 31 - 1)
+
+
+@pytest.mark.parametrize('raw', [
+    '["2020-01-01T00:00:00", 1e400]',
+    '["2020-01-01T00:00:00", 1.5]',
+    '["2020-01-01T00:00:00", true]',
+    '["2020-01-01T00:00:00", "1"]',
+    '["2020-01-01T00:00:00", 2147483648]',
+    '["2020-01-01T00:00:00", -2147483649]',
+    '["2020-01-01", 1, 2]',
+    '[20200101, 1]',
+    '{}',
+    'not json',
+])
+def test_forged_cursor_is_rejected(raw):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(forge(raw))
+    assert error.value.status_code == 400
@@ -0,0 +1,34 @@
+from app.database.database import Session
+from app.products.cache import MemoryCatalogueStorage, ProductCatalogue
+
+
+class InvalidatedSession:
+    # Products change and the cache is invalidated while a fill is reading
+
+    def __init__(self, session, catalogue: ProductCatalogue, company_id: int):
+        self.session = session
+        self.catalogue = catalogue
+        self.company_id = company_id
+
+    async def execute(self, *args, **kwargs):
+        result = await self.session.execute(*args, **kwargs)
+        await self.catalogue.invalidate(self.company_id)
+        return result
+
+
+async def fill_during_invalidation(company) -> tuple[dict, dict]:
+    catalogue = ProductCatalogue(storage=MemoryCatalogueStorage(maxsize=10), ttl=60)
+    async with Session() as session:
+        await catalogue.get(InvalidatedSession(session, catalogue, company.id), company.id)
+        stored = await catalogue.storage.get(str(company.id))
+
+        await catalogue.get(session, company.id)
+        refilled = await catalogue.storage.get(str(company.id))
+    return stored, refilled
+
+
+def test_fill_read_before_invalidation_isnt_stored(run, company):
+    stored, refilled = run(fill_during_invalidation(company))
+
+    assert stored is None
+    assert refilled is not None
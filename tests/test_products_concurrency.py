@@ -0,0 +1,64 @@
+import asyncio
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.database import models
+from app.database.database import Session
+from app.database.enums import UnitOfMeasureType
+from app.products.serializer import SellProducts
+from app.products.service import ProductService
+
+STOCK = 30
+SALES = 60
+
+
+async def create_product(company) -> int:
+    async with Session() as session, session.begin():
+        product = models.Product(
+            name=f'stocked-{company.suffix}',
+            purchase_price=Decimal(1),
+            sale_price=Decimal(2),
+            quantity=STOCK,
+            sale_quantity=STOCK,
+            unit_of_measure=UnitOfMeasureType.PIECES,
+            company_id=company.id
+        )
+        session.add(product)
+    return product.id
+
+
+async def sell(company, product_id: int) -> bool:
+    async with Session() as session:
+        try:
+            async with session.begin():
+                await ProductService.sell_products(
+                    session=session,
+                    principal=company.seller,
+                    data=[SellProducts(product_id=product_id, quantity=1)]
+                )
+        except HTTPException:
+            return False
+    return True
+
+
+async def sell_concurrently(company, product_id: int) -> tuple[list, models.Product]:
+    results = await asyncio.gather(*[
+        sell(company, product_id) for _ in range(SALES)
+    ])
+    async with Session() as session:
+        product = await session.scalar(
+            select(models.Product).filter_by(id=product_id)
+        )
+    return results, product
+
+
+def test_concurrent_sales_dont_oversell(run, company):
+    product_id = run(create_product(company))
+
+    results, product = run(sell_concurrently(company, product_id))
+
+    assert results.count(True) == STOCK
+    assert product.sale_quantity == 0
+    assert product.quantity == 0